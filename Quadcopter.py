@@ -4,7 +4,235 @@ Quadcopter Physical Model and Dynamics
 """
 
 import math
+from dataclasses import dataclass
+from enum import Enum
 import numpy as np
+from numba import njit
+from math_utils import FASTMATH
+
+
+# State vector layout
+IDX_X, IDX_Y, IDX_Z = 0, 1, 2
+IDX_VX, IDX_VY, IDX_VZ = 3, 4, 5
+IDX_ROLL, IDX_PITCH, IDX_YAW = 6, 7, 8
+IDX_P, IDX_Q, IDX_R = 9, 10, 11
+# Control inputs, stored after the 12 dynamic states
+IDX_THRUST, IDX_TORQUE_ROLL, IDX_TORQUE_PITCH, IDX_TORQUE_YAW = 12, 13, 14, 15
+STATE_SIZE = 16
+STATE_KEYS = ("x", "y", "z", "vx", "vy", "vz", "roll", "pitch", "yaw", "p", "q", "r",
+              "thrust", "torque_roll", "torque_pitch", "torque_yaw")
+
+# Control vector layout: [thrust, torque_roll, torque_pitch, torque_yaw]
+# Parameter vector layout: [mass, g, Ix, Iy, Iz]
+PARAMS_SIZE = 5
+
+GRAVITY = 9.81            # m/s^2
+INITIAL_Z = 2.5           # initial altitude (m)
+
+# Default stabilization limits (high values - mainly for safety)
+DEFAULT_MAX_ANGLE = 1.57  # radians (π/2 = 90 degrees!)
+DEFAULT_MAX_VEL = 50.0
+DEFAULT_MAX_POS = 500.0   # Increased - much higher, less likely to hit
+
+
+class Integrator(Enum):
+    """Numerical integration scheme used by Quadcopter.step"""
+    EULER = 1   # semi-implicit Euler (controller gains are tuned for this at 20 Hz)
+    RK4 = 2     # classical Runge-Kutta, needs dt <= RK4_MAX_DT with the default gains
+
+
+# Largest closed-loop RK4 step with the default CascadedController gains
+# (the attitude loops diverge from about dt = 0.014 on)
+RK4_MAX_DT = 0.01
+
+
+def state_bounds(max_angle, max_vel, max_pos):
+    """
+    Limits of the 12 dynamic states, shape (2, 12): row 0 lower, row 1 upper
+    Yaw and body rates are unlimited (+-inf); altitude cannot go below ground
+    """
+    inf = np.inf
+    return np.array([
+        [-max_pos, -max_pos, 0.0, -max_vel, -max_vel, -max_vel,
+         -max_angle, -max_angle, -inf, -inf, -inf, -inf],
+        [max_pos, max_pos, max_pos, max_vel, max_vel, max_vel,
+         max_angle, max_angle, inf, inf, inf, inf],
+    ])
+
+
+@njit(fastmath=FASTMATH, boundscheck=False, cache=True)
+def _rhs(state, ctrl, params):
+    """
+    State derivative of the 6-DOF model for constant control inputs
+    """
+    roll, pitch, yaw = state[6], state[7], state[8]
+    thrust = ctrl[0]
+    mass, g = params[0], params[1]
+
+    # cos/sin of the same angle side by side, so LLVM can pair them (sincos)
+    cr, sr = math.cos(roll), math.sin(roll)
+    cp, sp = math.cos(pitch), math.sin(pitch)
+    cy, sy = math.cos(yaw), math.sin(yaw)
+
+    # Third column of the ZYX body-to-world rotation matrix
+    r13 = cy * sp * cr + sy * sr
+    r23 = sy * sp * cr - cy * sr
+    r33 = cp * cr
+
+    dstate = np.empty(12)
+    # Velocity
+    dstate[0] = state[3]
+    dstate[1] = state[4]
+    dstate[2] = state[5]
+    # Translational acceleration
+    dstate[3] = thrust * r13 / mass
+    dstate[4] = thrust * r23 / mass
+    dstate[5] = (thrust * r33 - mass * g) / mass
+    # Angular velocity
+    dstate[6] = state[9]
+    dstate[7] = state[10]
+    dstate[8] = state[11]
+    # Angular acceleration (from Newton's laws)
+    dstate[9] = ctrl[1] / params[2]
+    dstate[10] = ctrl[2] / params[3]
+    dstate[11] = ctrl[3] / params[4]
+    return dstate
+
+
+@njit(fastmath=FASTMATH, boundscheck=False, cache=True)
+def _clip(state, bounds):
+    """Clamp the dynamic states to bounds (in place, branchless min/max)"""
+    for i in range(state.shape[0]):
+        state[i] = min(max(state[i], bounds[0, i]), bounds[1, i])
+    return state
+
+
+@njit(fastmath=FASTMATH, boundscheck=False, cache=True)
+def _apply_limits(state, bounds):
+    """Wrap yaw, stop at the ground and clamp all states to bounds (in place)"""
+    state[8] -= 2 * math.pi * round(state[8] / (2 * math.pi))
+
+    # Prevent going underground (z itself is clamped to 0 below)
+    if state[2] < 0.0:
+        state[5] = 0.0
+
+    return _clip(state, bounds)
+
+
+@njit(fastmath=FASTMATH, boundscheck=False, cache=True)
+def _step_rk4(state, ctrl, params, bounds, dt):
+    """
+    Integrate dynamics using classical 4th order Runge-Kutta (in place)
+    """
+    k1 = _rhs(state, ctrl, params)
+    k2 = _rhs(state + 0.5 * dt * k1, ctrl, params)
+    k3 = _rhs(state + 0.5 * dt * k2, ctrl, params)
+    k4 = _rhs(state + dt * k3, ctrl, params)
+    state += dt / 6.0 * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+    return _apply_limits(state, bounds)
+
+
+@njit(fastmath=FASTMATH, boundscheck=False, cache=True)
+def _step_euler(state, ctrl, params, bounds, dt):
+    """
+    Integrate dynamics using Euler method for one time step (in place)
+    All limits are applied once at the end of the step
+    """
+    x, y, z, vx, vy, vz, roll, pitch, yaw, p, q, r = (
+        state[0], state[1], state[2], state[3], state[4], state[5],
+        state[6], state[7], state[8], state[9], state[10], state[11])
+    thrust, torque_roll, torque_pitch, torque_yaw = ctrl[0], ctrl[1], ctrl[2], ctrl[3]
+    mass, g, Ix, Iy, Iz = params[0], params[1], params[2], params[3], params[4]
+
+    # Angular accelerations (from Newton's laws)
+    pdot = torque_roll / Ix
+    qdot = torque_pitch / Iy
+    rdot = torque_yaw / Iz
+
+    # Update angular velocities
+    p += pdot * dt
+    q += qdot * dt
+    r += rdot * dt
+
+    # Update Euler angles
+    roll += p * dt
+    pitch += q * dt
+    yaw += r * dt
+
+    # Convert thrust to world frame using Euler angles
+    # ZYX convention rotation matrix
+    # cos/sin of the same angle side by side, so LLVM can pair them (sincos)
+    cr, sr = math.cos(roll), math.sin(roll)
+    cp, sp = math.cos(pitch), math.sin(pitch)
+    cy, sy = math.cos(yaw), math.sin(yaw)
+
+    # Rotation matrix elements (body frame to world frame)
+    # For proper quadcopter dynamics:
+    # Pitch (+) = forward tilt → +X direction
+    # Roll (+) = right tilt → +Y direction
+
+    # Thrust vector in body frame is [0, 0, T], so only the third
+    # column of the rotation matrix is needed to transform it
+    r13 = cy * sp * cr + sy * sr
+    r23 = sy * sp * cr - cy * sr
+    r33 = cp * cr
+
+    # Thrust vector in world frame (body thrust [0,0,T])
+    fx = thrust * r13
+    fy = thrust * r23
+    fz = thrust * r33 - mass * g
+
+    # Linear accelerations
+    ax = fx / mass
+    ay = fy / mass
+    az = fz / mass
+
+    # Update velocities
+    vx += ax * dt
+    vy += ay * dt
+    vz += az * dt
+
+    # Update position
+    x += vx * dt
+    y += vy * dt
+    z += vz * dt
+
+    state[0], state[1], state[2] = x, y, z
+    state[3], state[4], state[5] = vx, vy, vz
+    state[6], state[7], state[8] = roll, pitch, yaw
+    state[9], state[10], state[11] = p, q, r
+
+    # Wrap yaw, stop at the ground, limit angles/velocities/position
+    return _apply_limits(state, bounds)
+
+
+def _param(col):
+    """
+    Property exposing one column of the parameter vector (a float for
+    Quadcopter, an (N,) view for BatchedQuadcopter); writes reach the
+    compiled step
+    """
+    def fget(self):
+        return self.params.T[col]
+
+    def fset(self, value):
+        self.params.T[col] = value
+
+    return property(fget, fset)
+
+
+def _limit(name):
+    """Stabilization limit property; assigning it rebuilds bounds in place"""
+    attr = "_" + name.lower()
+
+    def fget(self):
+        return getattr(self, attr)
+
+    def fset(self, value):
+        setattr(self, attr, value)
+        self.bounds[:] = state_bounds(self.MAX_ANGLE, self.MAX_VEL, self.MAX_POS)
+
+    return property(fget, fset)
 
 
 class Quadcopter:
@@ -12,8 +240,21 @@ class Quadcopter:
     Quadcopter 6-DOF dynamics model
     State: [x, y, z, vx, vy, vz, roll, pitch, yaw, p, q, r]
     """
+
+    # Physical parameters, stored in params
+    mass = _param(0)
+    g = _param(1)
+    Ix = _param(2)
+    Iy = _param(3)
+    Iz = _param(4)
+
+    # Stabilization limits, stored in bounds
+    MAX_ANGLE = _limit("MAX_ANGLE")
+    MAX_VEL = _limit("MAX_VEL")
+    MAX_POS = _limit("MAX_POS")
     
-    def __init__(self, mass=1.0, length=0.3, Ixx=0.01, Iyy=0.01, Izz=0.02):
+    def __init__(self, mass=1.0, length=0.3, Ixx=0.01, Iyy=0.01, Izz=0.02,
+                 integrator=Integrator.EULER):
         """
         Initialize quadcopter with physical parameters
         
@@ -21,178 +262,209 @@ class Quadcopter:
             mass: Vehicle mass (kg)
             length: Arm length (m)
             Ixx, Iyy, Izz: Moments of inertia (kg*m^2)
+            integrator: Integration scheme used by step()
         """
-        # Physical parameters
-        self.mass = mass
+        # Physical parameters [mass, g, Ix, Iy, Iz] (see the mass ... Iz properties)
+        self.params = np.array([mass, GRAVITY, Ixx, Iyy, Izz], dtype=np.float64)
         self.length = length
-        self.g = 9.81
-        
-        # Moments of inertia
-        self.Ix = Ixx
-        self.Iy = Iyy
-        self.Iz = Izz
-        
-        # State: position
-        self.x = 0.0
-        self.y = 0.0
-        self.z = 2.5    # Initial altitude
-        
-        # State: velocity
-        self.vx = 0.0
-        self.vy = 0.0
-        self.vz = 0.0
-        
-        # State: Euler angles (roll, pitch, yaw)
-        self.roll = 0.0
-        self.pitch = 0.0
-        self.yaw = 0.0
+        self.integrator = integrator
         
-        # State: Angular velocities
-        self.p = 0.0  # Roll rate
-        self.q = 0.0  # Pitch rate
-        self.r = 0.0  # Yaw rate
+        # State: [x, y, z, vx, vy, vz, roll, pitch, yaw, p, q, r,
+        #         thrust, torque_roll, torque_pitch, torque_yaw]
+        # Control inputs start at zero; thrust is set by the PID
+        self.state = np.zeros(STATE_SIZE)
+        self.state[IDX_Z] = INITIAL_Z
         
-        # Control inputs (thrust başlangıçta hover için düzenlenmiş)
-        self.torque_roll = 0.0
-        self.torque_pitch = 0.0
-        self.torque_yaw = 0.0
-        self.thrust = 0.0  # PID tarafından ayarlanacak
+        # Stabilization limits
+        self._max_angle = DEFAULT_MAX_ANGLE
+        self._max_vel = DEFAULT_MAX_VEL
+        self._max_pos = DEFAULT_MAX_POS
+        self.bounds = state_bounds(self.MAX_ANGLE, self.MAX_VEL, self.MAX_POS)
         
-        # Stabilization limits (high values - mainly for safety)
-        self.MAX_ANGLE = 1.57     # radians (π/2 = 90 degrees!)
-        self.MAX_VEL = 50.0
-        self.MAX_POS = 500.0      # Increased - much higher, less likely to hit
-        
-        # History for logging
-        self.history = []
+        # Views of the dynamic states and control inputs for the compiled step
+        self._dyn = self.state[:IDX_THRUST]
+        self._ctrl = self.state[IDX_THRUST:]
 
     def set_control(self, torque_roll, torque_pitch, torque_yaw, thrust):
         """Set control inputs (torques and thrust)"""
-        self.torque_roll = torque_roll
-        self.torque_pitch = torque_pitch
-        self.torque_yaw = torque_yaw
-        self.thrust = max(0.0, thrust)
+        state = self.state
+        state[IDX_THRUST] = max(0.0, thrust)
+        state[IDX_TORQUE_ROLL] = torque_roll
+        state[IDX_TORQUE_PITCH] = torque_pitch
+        state[IDX_TORQUE_YAW] = torque_yaw
 
     def step(self, dt):
         """
-        Integrate dynamics using Euler method for one time step
-        """
-        # Angular accelerations (from Newton's laws)
-        pdot = self.torque_roll / self.Ix
-        qdot = self.torque_pitch / self.Iy
-        rdot = self.torque_yaw / self.Iz
-        
-        # Update angular velocities
-        self.p += pdot * dt
-        self.q += qdot * dt
-        self.r += rdot * dt
-        
-        # Update Euler angles
-        self.roll += self.p * dt
-        self.pitch += self.q * dt
-        self.yaw += self.r * dt
-        
-        # Limit angles to prevent simulation instability
-        self.roll = max(-self.MAX_ANGLE, min(self.MAX_ANGLE, self.roll))
-        self.pitch = max(-self.MAX_ANGLE, min(self.MAX_ANGLE, self.pitch))
-        # yaw can rotate freely
-        
-        # Normalize yaw to [-pi, pi]
-        while self.yaw > math.pi:
-            self.yaw -= 2 * math.pi
-        while self.yaw < -math.pi:
-            self.yaw += 2 * math.pi
-
-        # Convert thrust to world frame using Euler angles
-        # ZYX convention rotation matrix
-        cr = math.cos(self.roll)
-        sr = math.sin(self.roll)
-        cp = math.cos(self.pitch)
-        sp = math.sin(self.pitch)
-        cy = math.cos(self.yaw)
-        sy = math.sin(self.yaw)
-        
-        # Rotation matrix elements (body frame to world frame)
-        # For proper quadcopter dynamics:
-        # Pitch (+) = forward tilt → +X direction
-        # Roll (+) = right tilt → +Y direction
-        
-        # Thrust vector in body frame is [0, 0, T]
-        # Transform to world frame
-        r11 = cy * cp
-        r12 = cy * sp * sr - sy * cr
-        r13 = cy * sp * cr + sy * sr
-        r21 = sy * cp
-        r22 = sy * sp * sr + cy * cr
-        r23 = sy * sp * cr - cy * sr
-        r31 = -sp
-        r32 = cp * sr
-        r33 = cp * cr
+        Integrate dynamics for one time step using the selected integrator
         
-        # Thrust vector in world frame (body thrust [0,0,T])
-        fx = self.thrust * r13
-        fy = self.thrust * r23
-        fz = self.thrust * r33 - self.mass * self.g
-        
-        # Linear accelerations
-        ax = fx / self.mass
-        ay = fy / self.mass
-        az = fz / self.mass
-        
-        # Update velocities
-        self.vx += ax * dt
-        self.vy += ay * dt
-        self.vz += az * dt
-        
-        # Limit velocities
-        self.vx = max(-self.MAX_VEL, min(self.MAX_VEL, self.vx))
-        self.vy = max(-self.MAX_VEL, min(self.MAX_VEL, self.vy))
-        self.vz = max(-self.MAX_VEL, min(self.MAX_VEL, self.vz))
-        
-        # Update position
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-        self.z += self.vz * dt
-        
-        # Prevent going underground
-        if self.z < 0.0:
-            self.z = 0.0
-            self.vz = 0.0
-        
-        # Limit position
-        self.x = max(-self.MAX_POS, min(self.MAX_POS, self.x))
-        self.y = max(-self.MAX_POS, min(self.MAX_POS, self.y))
-        self.z = max(0.0, min(self.MAX_POS, self.z))
+        Returns:
+            The live state array (see get_state)
+        """
+        if self.integrator is Integrator.RK4:
+            _step_rk4(self._dyn, self._ctrl, self.params, self.bounds, dt)
+        else:
+            _step_euler(self._dyn, self._ctrl, self.params, self.bounds, dt)
+        return self.state
 
     def get_state(self):
-        """Return current state as dictionary"""
-        return {
-            "x": self.x, "y": self.y, "z": self.z,
-            "vx": self.vx, "vy": self.vy, "vz": self.vz,
-            "roll": self.roll, "pitch": self.pitch, "yaw": self.yaw,
-            "p": self.p, "q": self.q, "r": self.r,
-            "thrust": self.thrust,
-            "torque_roll": self.torque_roll,
-            "torque_pitch": self.torque_pitch,
-            "torque_yaw": self.torque_yaw
-        }
+        """
+        Return the live state array (layout IDX_X ... IDX_TORQUE_YAW)
+        This is not a copy: it changes on the next step()
+        """
+        return self.state
+
+    def state_as_dict(self):
+        """Return a snapshot of the state as a dictionary (for display)"""
+        return dict(zip(STATE_KEYS, self.state.tolist()))
     
     def reset(self):
         """Reset quadcopter to initial state"""
-        self.x = 0.0
-        self.y = 0.0
-        self.z = 2.5
-        
-        self.vx = 0.0
-        self.vy = 0.0
-        self.vz = 0.0
-        
-        self.roll = 0.0
-        self.pitch = 0.0
-        self.yaw = 0.0
-        
-        self.p = 0.0
-        self.q = 0.0
-        self.r = 0.0
-        
-        self.history = []
\ No newline at end of file
+        self._dyn[:] = 0.0
+        self.state[IDX_Z] = INITIAL_Z
+
+
+def _column(idx):
+    """Property exposing one state component of a BatchState as an (N,) view"""
+    def fget(self):
+        return self.data[:, idx]
+
+    def fset(self, value):
+        self.data[:, idx] = value
+
+    return property(fget, fset)
+
+
+@dataclass
+class BatchState:
+    """
+    State of N quadcopters backed by one (N, 12) float64 array
+    Columns follow the single-vehicle layout (IDX_X ... IDX_R)
+    """
+    data: np.ndarray
+
+    x = _column(IDX_X)
+    y = _column(IDX_Y)
+    z = _column(IDX_Z)
+    vx = _column(IDX_VX)
+    vy = _column(IDX_VY)
+    vz = _column(IDX_VZ)
+    roll = _column(IDX_ROLL)
+    pitch = _column(IDX_PITCH)
+    yaw = _column(IDX_YAW)
+    p = _column(IDX_P)
+    q = _column(IDX_Q)
+    r = _column(IDX_R)
+
+    @classmethod
+    def initial(cls, num_drones, z0=INITIAL_Z):
+        """Create N vehicles at rest at altitude z0"""
+        data = np.zeros((num_drones, 12))
+        data[:, IDX_Z] = z0
+        return cls(data)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+
+def _batched_step_euler(s, ctrl, params, bounds, dt):
+    """
+    Vectorized counterpart of _step_euler for an (N, 12) state block (in place)
+    ctrl is (N, 4), params is (N, 5) and bounds is (2, 12), in the single-vehicle layouts
+    """
+    thrust = ctrl[:, 0]
+    mass, g = params[:, 0], params[:, 1]
+
+    # Angular rates, then Euler angles
+    s[:, IDX_P:IDX_R + 1] += ctrl[:, 1:4] / params[:, 2:5] * dt
+    s[:, IDX_ROLL:IDX_YAW + 1] += s[:, IDX_P:IDX_R + 1] * dt
+
+    # One cos and one sin pass over all three angles of all vehicles
+    angles = s[:, IDX_ROLL:IDX_YAW + 1].T
+    cr, cp, cy = np.cos(angles)
+    sr, sp, sy = np.sin(angles)
+
+    # Thrust along the third column of the body-to-world rotation matrix
+    r13 = cy * sp * cr + sy * sr
+    r23 = sy * sp * cr - cy * sr
+    r33 = cp * cr
+
+    s[:, IDX_VX] += thrust * r13 / mass * dt
+    s[:, IDX_VY] += thrust * r23 / mass * dt
+    s[:, IDX_VZ] += (thrust * r33 - mass * g) / mass * dt
+
+    s[:, IDX_X:IDX_Z + 1] += s[:, IDX_VX:IDX_VZ + 1] * dt
+
+    # Wrap yaw to [-pi, pi), stop at the ground, then apply all limits at once
+    s[:, IDX_YAW] = np.mod(s[:, IDX_YAW] + np.pi, 2 * np.pi) - np.pi
+    s[s[:, IDX_Z] < 0.0, IDX_VZ] = 0.0
+    np.clip(s, bounds[0], bounds[1], out=s)
+    return s
+
+
+class BatchedQuadcopter:
+    """
+    N independent quadcopters integrated together with NumPy ufuncs
+    Physical parameters may be scalars or (N,) arrays (e.g. for parameter sweeps)
+    """
+
+    # Physical parameters, (N,) views of params
+    mass = _param(0)
+    g = _param(1)
+    Ix = _param(2)
+    Iy = _param(3)
+    Iz = _param(4)
+
+    # Stabilization limits, stored in bounds
+    MAX_ANGLE = _limit("MAX_ANGLE")
+    MAX_VEL = _limit("MAX_VEL")
+    MAX_POS = _limit("MAX_POS")
+
+    def __init__(self, num_drones, mass=1.0, Ixx=0.01, Iyy=0.01, Izz=0.02):
+        """
+        Initialize the batch
+
+        Args:
+            num_drones: Number of vehicles N
+            mass: Vehicle mass (kg)
+            Ixx, Iyy, Izz: Moments of inertia (kg*m^2)
+        """
+        self.num_drones = num_drones
+        self.state = BatchState.initial(num_drones)
+
+        # Stabilization limits (same as Quadcopter)
+        self._max_angle = DEFAULT_MAX_ANGLE
+        self._max_vel = DEFAULT_MAX_VEL
+        self._max_pos = DEFAULT_MAX_POS
+
+        # Per-vehicle parameters and controls in the single-vehicle layouts
+        self.params = np.empty((num_drones, PARAMS_SIZE))
+        for col, value in enumerate((mass, GRAVITY, Ixx, Iyy, Izz)):
+            self.params[:, col] = value
+        self.bounds = state_bounds(self.MAX_ANGLE, self.MAX_VEL, self.MAX_POS)
+        self.ctrl = np.zeros((num_drones, 4))
+
+    def set_control(self, torque_roll, torque_pitch, torque_yaw, thrust, idx=slice(None)):
+        """Set control inputs for the vehicles selected by idx"""
+        ctrl = self.ctrl
+        ctrl[idx, 0] = np.maximum(thrust, 0.0)
+        ctrl[idx, 1] = torque_roll
+        ctrl[idx, 2] = torque_pitch
+        ctrl[idx, 3] = torque_yaw
+
+    def step(self, dt, idx=slice(None)):
+        """
+        Integrate the vehicles selected by idx (slice or index array) one step
+        """
+        if isinstance(idx, slice) and idx == slice(None):
+            _batched_step_euler(self.state.data, self.ctrl, self.params, self.bounds, dt)
+        else:
+            block = self.state.data[idx]
+            _batched_step_euler(block, self.ctrl[idx], self.params[idx], self.bounds, dt)
+            self.state.data[idx] = block
+        return self.state.data
+
+    def reset(self, idx=slice(None)):
+        """Reset the selected vehicles to the initial state"""
+        self.state.data[idx] = 0.0
+        self.state.data[idx, IDX_Z] = INITIAL_Z
+        self.ctrl[idx] = 0.0
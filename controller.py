@@ -8,6 +8,37 @@ import pygame
 import math
 
 
+# Bit positions of the control keys in a key mask
+BIT_SPACE, BIT_SHIFT, BIT_W, BIT_S, BIT_A, BIT_D, BIT_Q, BIT_E = range(8)
+
+KEY_BITS = {
+    pygame.K_SPACE: 1 << BIT_SPACE,
+    pygame.K_LSHIFT: 1 << BIT_SHIFT,
+    pygame.K_RSHIFT: 1 << BIT_SHIFT,
+    pygame.K_w: 1 << BIT_W,
+    pygame.K_s: 1 << BIT_S,
+    pygame.K_a: 1 << BIT_A,
+    pygame.K_d: 1 << BIT_D,
+    pygame.K_q: 1 << BIT_Q,
+    pygame.K_e: 1 << BIT_E,
+}
+
+
+def read_key_mask():
+    """Read the keyboard once and pack the control keys into an int bitmask"""
+    keys = pygame.key.get_pressed()
+    mask = 0
+    for key, bit in KEY_BITS.items():
+        if keys[key]:
+            mask |= bit
+    return mask
+
+
+def _key_axis(mask, pos_bit, neg_bit):
+    """+1 / -1 / 0 from a pair of opposing keys (both pressed cancel out)"""
+    return ((mask >> pos_bit) & 1) - ((mask >> neg_bit) & 1)
+
+
 class ManualController:
     """
     Keyboard-based manual control for quadcopter
@@ -40,58 +71,43 @@ class ManualController:
         Returns:
             (roll_ref, pitch_ref, yaw_ref, z_ref)
         """
-        keys = pygame.key.get_pressed()
+        return self.update_from_mask(read_key_mask())
+
+    def update_from_mask(self, mask):
+        """
+        Update references from a key mask (see KEY_BITS); also used to
+        replay recorded input without a display
         
+        Returns:
+            (roll_ref, pitch_ref, yaw_ref, z_ref)
+        """
         if not self.control_active:
             return self.roll_ref, self.pitch_ref, self.yaw_ref, self.z_ref
         
         # ---- ALTITUDE CONTROL ----
-        # SPACE: increase altitude (10 times faster than before!)
-        if keys[pygame.K_SPACE]:
-            self.z_ref = min(self.z_ref + self.alt_step * 10, self.MAX_Z)
-        # SHIFT: decrease altitude (10 times faster!)
-        elif keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]:
-            self.z_ref = max(self.z_ref - self.alt_step * 10, self.MIN_Z)
+        # SPACE: increase, SHIFT: decrease (10 times faster than before!)
         # No decay for altitude - keep reference
+        alt_dir = _key_axis(mask, BIT_SPACE, BIT_SHIFT)
+        self.z_ref = max(self.MIN_Z, min(self.MAX_Z, self.z_ref + alt_dir * self.alt_step * 10))
         
-        # ---- PITCH CONTROL (forward/backward) ----
-        # W: pitch forward
-        if keys[pygame.K_w]:
-            self.pitch_ref = min(self.pitch_ref + self.angle_step, self.MAX_ANGLE)
-        # S: pitch backward
-        elif keys[pygame.K_s]:
-            self.pitch_ref = max(self.pitch_ref - self.angle_step, -self.MAX_ANGLE)
-        else:
-            # IMMEDIATE RESET - no decay, just go to 0
-            self.pitch_ref = 0.0
-        
-        # ---- ROLL CONTROL (left/right) ----
-        # A: roll left
-        if keys[pygame.K_a]:
-            self.roll_ref = min(self.roll_ref + self.angle_step, self.MAX_ANGLE)
-        # D: roll right
-        elif keys[pygame.K_d]:
-            self.roll_ref = max(self.roll_ref - self.angle_step, -self.MAX_ANGLE)
-        else:
-            # IMMEDIATE RESET - no decay, just go to 0
-            self.roll_ref = 0.0
+        # ---- PITCH CONTROL (W: forward, S: backward) ----
+        # No key: IMMEDIATE RESET - no decay, just go to 0
+        pitch_dir = _key_axis(mask, BIT_W, BIT_S)
+        self.pitch_ref = (max(-self.MAX_ANGLE, min(self.MAX_ANGLE,
+                                                    self.pitch_ref + pitch_dir * self.angle_step))
+                          if pitch_dir else 0.0)
         
-        # ---- YAW CONTROL (rotation) ----
-        # Q: rotate counter-clockwise
-        if keys[pygame.K_q]:
-            self.yaw_ref += self.angle_step
-        # E: rotate clockwise
-        elif keys[pygame.K_e]:
-            self.yaw_ref -= self.angle_step
-        else:
-            # Reset yaw to 0
-            self.yaw_ref = 0.0
+        # ---- ROLL CONTROL (A: left, D: right) ----
+        roll_dir = _key_axis(mask, BIT_A, BIT_D)
+        self.roll_ref = (max(-self.MAX_ANGLE, min(self.MAX_ANGLE,
+                                                   self.roll_ref + roll_dir * self.angle_step))
+                         if roll_dir else 0.0)
         
-        # Normalize yaw to [-pi, pi]
-        while self.yaw_ref > math.pi:
-            self.yaw_ref -= 2 * math.pi
-        while self.yaw_ref < -math.pi:
-            self.yaw_ref += 2 * math.pi
+        # ---- YAW CONTROL (Q: counter-clockwise, E: clockwise) ----
+        # No key: reset yaw to 0; normalize to [-pi, pi]
+        yaw_dir = _key_axis(mask, BIT_Q, BIT_E)
+        self.yaw_ref = (math.remainder(self.yaw_ref + yaw_dir * self.angle_step, 2 * math.pi)
+                        if yaw_dir else 0.0)
         
         return self.roll_ref, self.pitch_ref, self.yaw_ref, self.z_ref
 
@@ -0,0 +1,22 @@
+# drone_state.py
+"""
+Per-frame display state shared by the simulator and the visualization
+(kept free of numba/pygame so either side can import it cheaply)
+"""
+
+
+class DroneState:
+    """
+    Fixed-field snapshot of what the display shows each frame
+    Attribute access replaces the per-frame extended-state dictionary
+    """
+    __slots__ = ("x", "y", "z", "vx", "vy", "vz", "roll", "pitch", "yaw",
+                 "roll_ref", "pitch_ref", "z_ref", "thrust", "sim_time")
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name, 0.0))
+
+    def __repr__(self):
+        return "DroneState(" + ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in self.__slots__) + ")"
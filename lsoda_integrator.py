@@ -0,0 +1,105 @@
+# lsoda_integrator.py
+"""
+Adaptive (LSODA) closed-loop integration between rendered frames, via numbalsoda
+"""
+
+import numpy as np
+from numba import cfunc, carray, njit
+from numbalsoda import lsoda, lsoda_sig
+
+from Quadcopter import IDX_Z, IDX_VZ, IDX_ROLL, IDX_PITCH, IDX_YAW, PARAMS_SIZE, _rhs
+
+# ODE state layout: 12 dynamic states, 4 PID integrals, 4 derivative filter states
+ODE_SIZE = 20
+IDX_INTEGRAL = 12
+IDX_FILTER = 16
+
+# Data vector layout: Quadcopter params (5), refs [z, roll, pitch, yaw] (4),
+# packed CascadedController gains (4 x 5)
+IDX_DATA_REFS = PARAMS_SIZE
+IDX_DATA_GAINS = IDX_DATA_REFS + 4
+DATA_SIZE = IDX_DATA_GAINS + 20
+
+# Continuous derivative filters need tau > 0
+MIN_FILTER_TAU = 1e-3
+
+
+@njit(fastmath=True, cache=True)
+def _loop_errors(u, data, err):
+    """Errors of the altitude (with velocity damping), roll, pitch and yaw loops"""
+    refs = data[IDX_DATA_REFS:IDX_DATA_REFS + 4]
+    err[0] = refs[0] - u[IDX_Z] - 0.2 * u[IDX_VZ]
+    err[1] = refs[1] - u[IDX_ROLL]
+    err[2] = refs[2] - u[IDX_PITCH]
+    err[3] = refs[3] - u[IDX_YAW]
+    return err
+
+
+@njit(fastmath=True, cache=True)
+def _controls(u, data, ctrl):
+    """
+    Continuous-time PID outputs for ODE state u
+    The derivative term is kd * (e - f) / tau with filter state f' = (e - f) / tau
+
+    Returns:
+        ctrl [thrust, torque_roll, torque_pitch, torque_yaw]
+    """
+    err = _loop_errors(u, data, np.empty(4))
+    for k in range(4):
+        g = data[IDX_DATA_GAINS + 5 * k:IDX_DATA_GAINS + 5 * k + 5]
+        tau = max(g[4], MIN_FILTER_TAU)
+        d_term = g[2] * (err[k] - u[IDX_FILTER + k]) / tau
+        ctrl[k] = g[0] * err[k] + g[1] * u[IDX_INTEGRAL + k] + d_term
+    # Altitude loop output is added to hover thrust
+    ctrl[0] = max(0.0, data[0] * data[1] + ctrl[0])
+    return ctrl
+
+
+@cfunc(lsoda_sig)
+def _closed_loop_rhs(t, u_ptr, du_ptr, data_ptr):
+    """Closed-loop derivative for LSODA (quadcopter + PID states)"""
+    u = carray(u_ptr, (ODE_SIZE,))
+    du = carray(du_ptr, (ODE_SIZE,))
+    data = carray(data_ptr, (DATA_SIZE,))
+
+    ctrl = _controls(u, data, np.empty(4))
+    du[:IDX_INTEGRAL] = _rhs(u[:IDX_INTEGRAL], ctrl, data[:PARAMS_SIZE])
+
+    err = _loop_errors(u, data, np.empty(4))
+    for k in range(4):
+        g = data[IDX_DATA_GAINS + 5 * k:IDX_DATA_GAINS + 5 * k + 5]
+        # Conditional integration (anti-windup)
+        integral = u[IDX_INTEGRAL + k]
+        if (integral >= g[3] and err[k] > 0.0) or (integral <= -g[3] and err[k] < 0.0):
+            du[IDX_INTEGRAL + k] = 0.0
+        else:
+            du[IDX_INTEGRAL + k] = err[k]
+        tau = max(g[4], MIN_FILTER_TAU)
+        du[IDX_FILTER + k] = (err[k] - u[IDX_FILTER + k]) / tau
+
+
+def integrate(u0, t0, t1, data, rtol=1e-6, atol=1e-8):
+    """
+    Integrate the closed loop from t0 to t1
+
+    Returns:
+        ODE state at t1
+
+    Raises:
+        RuntimeError: if LSODA fails
+    """
+    usol, success = lsoda(_closed_loop_rhs.address, u0, np.array([t0, t1]),
+                          data=data, rtol=rtol, atol=atol)
+    if not success:
+        raise RuntimeError(f"LSODA integration failed between t={t0:.3f}s and t={t1:.3f}s")
+    return usol[-1]
+
+
+def controls(u, data):
+    """Controls [thrust, torque_roll, torque_pitch, torque_yaw] at ODE state u"""
+    return _controls(u, data, np.empty(4))
+
+
+def loop_errors(u, data):
+    """Loop errors [alt, roll, pitch, yaw] at ODE state u"""
+    return _loop_errors(u, data, np.empty(4))
@@ -5,17 +5,34 @@ Quadcopter Motion Control Real-Time System
 """
 
 import sys
+import time
+import argparse
 import pygame
 from controller import ManualController
 from simulator import QuadcopterSimulator
+from Quadcopter import IDX_X, IDX_Z, IDX_VX
 from visualization import Visualizer
 from ui import UserInterface, SimulationConfig, AppState
 
 
+# Buffered console output is flushed at most this often (seconds)
+LOG_FLUSH_INTERVAL = 1.0
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Quadcopter Motion Control - Real-Time Systems")
+    parser.add_argument("--verbose", action="store_true",
+                        help="print periodic debug and statistics lines")
+    return parser.parse_args()
+
+
 def main():
     """
     Main application loop
     """
+    args = parse_args()
+    
     # Initialize Pygame
     pygame.init()
     
@@ -64,17 +81,21 @@ def main():
     print("\n[WAIT] Initializing drone...\n")
     
     # Initialize drone
-    simulator.quad.z = initial_z
+    simulator.quad.state[IDX_Z] = initial_z
     simulator.z_ref = initial_z
     
     # Warm-up: Run 50 steps to stabilize
     print("[...] Stabilizing control system...")
     for _ in range(50):
-        state = simulator.step(dt)
+        simulator.step(dt)
         sim_time += dt
         step_count += 1
     
-    print(f"✓ Ready! Alt: {simulator.quad.z:.2f}m - Press SPACE to fly\n")
+    print(f"✓ Ready! Alt: {simulator.quad.state[IDX_Z]:.2f}m - Press SPACE to fly\n")
+    
+    # Periodic console lines (only with --verbose), flushed once per second
+    log_buf = []
+    last_flush = time.perf_counter()
     
     # Main simulation loop
     while ui.is_running():
@@ -92,6 +113,9 @@ def main():
             step_count = 0
             print("Simulation reset!")
         
+        if changes["redraw"]:
+            visualizer.invalidate()
+        
         if changes["pause_toggle"]:
             if ui.is_paused():
                 print("Simulation paused")
@@ -101,35 +125,43 @@ def main():
         # Update simulation if not paused
         if not ui.is_paused():
             # Get user input and update references
-            roll_ref, pitch_ref, yaw_ref, z_ref = controller.update_from_keyboard()
+            roll_ref, pitch_ref, yaw_ref, z_ref = controller.update_from_mask(ui.key_mask)
             simulator.set_references(roll_ref, pitch_ref, yaw_ref, z_ref)
             
-            # DEBUG: Print pitch_ref every 10 steps
-            if step_count % 10 == 0:
-                print(f"DEBUG [Step {step_count}]: pitch_ref={pitch_ref:+.3f}rad, X={simulator.quad.x:.2f}m, Vx={simulator.quad.vx:.2f}m/s", flush=True)
+            # DEBUG: Log pitch_ref every 100 steps
+            if args.verbose and step_count % 100 == 0:
+                log_buf.append(f"DEBUG [Step {step_count}]: pitch_ref={pitch_ref:+.3f}rad, X={simulator.quad.state[IDX_X]:.2f}m, Vx={simulator.quad.state[IDX_VX]:.2f}m/s")
             
-            # Perform simulation step
-            state = simulator.step(dt)
+            # Perform simulation step (or integrate adaptively up to the next frame)
+            if config.use_lsoda:
+                simulator.step_until(simulator.sim_time + dt)
+            else:
+                simulator.step(dt)
             sim_time += dt
             step_count += 1
-        else:
-            # Get current state without stepping
-            state = simulator.get_extended_state()
         
-        # Get extended state with references and errors
-        state = simulator.get_extended_state()
+        # Displayed state with references (refreshed in place once per frame,
+        # paused or not)
+        state = simulator.drone_state()
         
         # Update visualization
-        visualizer.update(state)
+        visualizer.update(state, ui.key_mask)
         
         # Get frame rate and control update frequency
         fps = ui.get_frame_rate(target_fps=int(1/dt))
         
-        # Print statistics periodically
-        if step_count % 100 == 0 and not ui.is_paused():
-            print(f"Step: {step_count:6d} | Time: {sim_time:7.2f}s | "
-                  f"Alt: {state['z']:6.2f}m | Roll: {state['roll']:6.3f}rad | "
-                  f"Pitch: {state['pitch']:6.3f}rad | FPS: {fps:5.1f}")
+        # Log statistics periodically
+        if args.verbose and step_count % 100 == 0 and not ui.is_paused():
+            log_buf.append(f"Step: {step_count:6d} | Time: {sim_time:7.2f}s | "
+                           f"Alt: {state.z:6.2f}m | Roll: {state.roll:6.3f}rad | "
+                           f"Pitch: {state.pitch:6.3f}rad | FPS: {fps:5.1f}")
+        
+        # Flush buffered lines at a fixed wall-clock rate
+        now = time.perf_counter()
+        if log_buf and now - last_flush >= LOG_FLUSH_INTERVAL:
+            print("\n".join(log_buf), flush=True)
+            log_buf.clear()
+            last_flush = now
         
         # Draw debug info if enabled
         if ui.show_debug_info:
@@ -140,11 +172,13 @@ def main():
             ui.draw_pause_overlay()
     
     # Cleanup
+    if log_buf:
+        print("\n".join(log_buf))
     print("\n" + "=" * 60)
     print(f"Simulation ended at:")
     print(f"  Time: {sim_time:.2f}s")
     print(f"  Steps: {step_count}")
-    print(f"  Final altitude: {state['z']:.2f}m")
+    print(f"  Final altitude: {simulator.quad.state[IDX_Z]:.2f}m")
     print("=" * 60)
     
     pygame.quit()
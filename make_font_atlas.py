@@ -0,0 +1,47 @@
+# make_font_atlas.py
+"""
+Offline tool: pre-rasterize the dynamic-text glyph atlases into assets/
+Run once on the machine that shows the simulation (the fonts come from its
+SysFont lookup); at startup the atlases are then loaded from PNG instead of
+rendered glyph by glyph. Missing atlases are still rendered at runtime.
+"""
+
+import os
+import argparse
+import pygame
+from visualization import BITMAP_FONT_DIR, BITMAP_FONTS, GlyphAtlas, bitmap_font_path
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Pre-render glyph atlases for the visualizer")
+    parser.add_argument("--force", action="store_true",
+                        help="overwrite atlases that already exist")
+    return parser.parse_args()
+
+
+def main():
+    """Write every (font, color) atlas listed in visualization.BITMAP_FONTS"""
+    args = parse_args()
+
+    # Glyphs are converted to the display format, so a (hidden) display is needed
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    os.makedirs(BITMAP_FONT_DIR, exist_ok=True)
+
+    for spec, colors in BITMAP_FONTS.items():
+        font = pygame.font.SysFont(*spec)
+        for color in colors:
+            path = bitmap_font_path(spec, color)
+            if os.path.exists(path + ".png") and not args.force:
+                print(f"  exists  {path}.png")
+                continue
+            GlyphAtlas(font, color).save(path)
+            print(f"  wrote   {path}.png")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
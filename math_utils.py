@@ -7,6 +7,11 @@ import math
 import numpy as np
 
 
+# Numba fastmath flags without the no-inf/no-NaN assumptions, for kernels that
+# see inf (unlimited integrators, unbounded states)
+FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+
 def euler_to_rotation_matrix(roll, pitch, yaw):
     """
     Convert Euler angles (roll, pitch, yaw) to rotation matrix
@@ -29,6 +34,31 @@ def euler_to_rotation_matrix(roll, pitch, yaw):
     return R
 
 
+def euler_to_rotation_matrix_batch(roll, pitch, yaw):
+    """
+    Vectorized euler_to_rotation_matrix for (N,) arrays of angles
+    Returns an (N, 3, 3) array of ZYX rotation matrices
+    """
+    # One cos and one sin pass over all angles
+    angles = np.stack(np.broadcast_arrays(roll, pitch, yaw)).astype(np.float64)
+    cr, cp, cy = np.cos(angles)
+    sr, sp, sy = np.sin(angles)
+
+    # Fill one contiguous buffer element by element
+    R = np.empty(angles.shape[1:] + (3, 3))
+    R[..., 0, 0] = cy * cp
+    R[..., 0, 1] = cy * sp * sr - sy * cr
+    R[..., 0, 2] = cy * sp * cr + sy * sr
+    R[..., 1, 0] = sy * cp
+    R[..., 1, 1] = sy * sp * sr + cy * cr
+    R[..., 1, 2] = sy * sp * cr - cy * sr
+    R[..., 2, 0] = -sp
+    R[..., 2, 1] = cp * sr
+    R[..., 2, 2] = cp * cr
+
+    return R
+
+
 def body_to_world_frame(body_vector, roll, pitch, yaw):
     """
     Transform a vector from body frame to world frame
@@ -38,6 +68,14 @@ def body_to_world_frame(body_vector, roll, pitch, yaw):
     return world_vector
 
 
+def body_to_world_frame_batch(body_vectors, roll, pitch, yaw):
+    """
+    Transform (N, 3) body-frame vectors to world frame for (N,) angle arrays
+    """
+    R = euler_to_rotation_matrix_batch(roll, pitch, yaw)
+    return np.einsum('nij,nj->ni', R, body_vectors)
+
+
 def rotation_matrix_to_euler(R):
     """
     Convert rotation matrix to Euler angles
@@ -3,13 +3,83 @@
 PID Controller implementation for quadcopter control
 """
 
+import numpy as np
+from numba import njit
+from math_utils import FASTMATH
+
+
+# Rows of the packed CascadedController arrays
+LOOP_ALT, LOOP_ROLL, LOOP_PITCH, LOOP_YAW = 0, 1, 2, 3
+# Packed gains per loop: [kp, ki, kd, integrator_limit, derivative_filter_tau]
+# Packed state per loop: [integral, prev_error, filtered_derivative, first_call]
+# An unlimited integrator is stored as inf (hence FASTMATH instead of fastmath=True)
+
+
+def derivative_filter_alpha(tau, dt):
+    """
+    Derivative filter coefficients alpha = dt / (dt + tau) for packed tau
+    values (any shape); tau <= 0 means no filtering (alpha = 1)
+    """
+    tau = np.asarray(tau, dtype=np.float64)
+    return np.divide(dt, dt + tau, out=np.ones_like(tau), where=tau > 0)
+
+
+@njit(fastmath=FASTMATH, boundscheck=False, cache=True)
+def _pid_update(gains, alpha, pid_state, loop, error, dt):
+    """
+    PID update on row `loop` of the packed arrays
+    alpha holds the derivative filter coefficients for dt (1 = no filtering)
+    """
+    kp, ki, kd, limit = gains[loop, 0], gains[loop, 1], gains[loop, 2], gains[loop, 3]
+    a = alpha[loop]
+
+    # Integral term with anti-windup
+    integral = max(-limit, min(limit, pid_state[loop, 0] + error * dt))
+    pid_state[loop, 0] = integral
+
+    # Derivative term with filtering
+    if pid_state[loop, 3] != 0.0:
+        d_term = 0.0
+        pid_state[loop, 3] = 0.0
+    else:
+        raw_derivative = (error - pid_state[loop, 1]) / dt if dt > 0 else 0.0
+        pid_state[loop, 2] = a * raw_derivative + (1 - a) * pid_state[loop, 2]
+        d_term = kd * pid_state[loop, 2]
+
+    pid_state[loop, 1] = error
+    return kp * error + ki * integral + d_term
+
+
+def _packed(array, col):
+    """Property exposing one entry of a one-loop PID's packed gains or state"""
+    def fget(self):
+        return float(getattr(self, array)[0, col])
+
+    def fset(self, value):
+        getattr(self, array)[0, col] = value
+
+    return property(fget, fset)
+
 
 class PID:
     """
     Standard PID controller with integral saturation and derivative filtering
+    One loop in the packed CascadedController layout, updated by _pid_update
+    
+    Every configuration runs through the one compiled kernel: no integrator
+    limit is stored as inf and no filtering as alpha = 1, so update() has no
+    per-configuration branches
     """
+
+    # Gains and state, views of the packed arrays
+    kp = _packed("gains", 0)
+    ki = _packed("gains", 1)
+    kd = _packed("gains", 2)
+    integral = _packed("pid_state", 0)
+    prev_error = _packed("pid_state", 1)
+    filtered_derivative = _packed("pid_state", 2)
     
-    def __init__(self, kp, ki, kd, integrator_limit=None, derivative_filter_tau=0.0):
+    def __init__(self, kp, ki, kd, integrator_limit=None, derivative_filter_tau=0.0, dt=None):
         """
         Initialize PID controller
         
@@ -19,25 +89,65 @@ class PID:
             kd: Derivative gain
             integrator_limit: Limit for integral term (anti-windup)
             derivative_filter_tau: Low-pass filter time constant for derivative
+            dt: Fixed time step, if known (filter coefficient computed up front)
         """
-        self.kp = kp
-        self.ki = ki
-        self.kd = kd
-        self.integrator_limit = integrator_limit
-        self.derivative_filter_tau = derivative_filter_tau
+        limit = np.inf if integrator_limit is None else integrator_limit
+        # Gains: [[kp, ki, kd, integrator_limit, derivative_filter_tau]]
+        self.gains = np.array([[kp, ki, kd, limit, derivative_filter_tau]], dtype=np.float64)
         
-        # State
-        self.integral = 0.0
-        self.prev_error = 0.0
-        self.filtered_derivative = 0.0
-        self.first_call = True
+        # State: [[integral, prev_error, filtered_derivative, first_call]]
+        self.pid_state = np.zeros((1, 4))
+        self.pid_state[0, 3] = 1.0
+        
+        # Derivative filter coefficient for the configured time step
+        self.dt = None
+        self.alpha = np.ones(1)
+        if dt is not None:
+            self.configure(dt)
+
+    def configure(self, dt):
+        """
+        Precompute the derivative filter coefficient for a fixed time step
+        Called automatically when update() sees a new dt; call again after
+        changing the tau entry of gains
+        """
+        self.dt = dt
+        self.alpha[:] = derivative_filter_alpha(self.gains[:, 4], dt)
+
+    @property
+    def integrator_limit(self):
+        """Limit for the integral term (None if unlimited)"""
+        limit = self.gains[0, 3]
+        return None if np.isinf(limit) else float(limit)
+
+    @integrator_limit.setter
+    def integrator_limit(self, value):
+        self.gains[0, 3] = np.inf if value is None else value
+
+    @property
+    def derivative_filter_tau(self):
+        """Derivative filter time constant (reconfigures alpha when set)"""
+        return float(self.gains[0, 4])
+
+    @derivative_filter_tau.setter
+    def derivative_filter_tau(self, value):
+        self.gains[0, 4] = value
+        if self.dt is not None:
+            self.configure(self.dt)
+
+    @property
+    def first_call(self):
+        """True until the first update() after construction or reset()"""
+        return bool(self.pid_state[0, 3])
+
+    @first_call.setter
+    def first_call(self, value):
+        self.pid_state[0, 3] = float(value)
 
     def reset(self):
         """Reset controller state"""
-        self.integral = 0.0
-        self.prev_error = 0.0
-        self.filtered_derivative = 0.0
-        self.first_call = True
+        self.pid_state[:] = 0.0
+        self.pid_state[0, 3] = 1.0
 
     def update(self, error, dt):
         """
@@ -50,35 +160,9 @@ class PID:
         Returns:
             Control output
         """
-        # Proportional term
-        p_term = self.kp * error
-        
-        # Integral term with anti-windup
-        self.integral += error * dt
-        if self.integrator_limit is not None:
-            self.integral = max(-self.integrator_limit, 
-                              min(self.integrator_limit, self.integral))
-        i_term = self.ki * self.integral
-        
-        # Derivative term with filtering
-        if self.first_call:
-            d_term = 0.0
-            self.first_call = False
-        else:
-            raw_derivative = (error - self.prev_error) / dt if dt > 0 else 0.0
-            
-            # Low-pass filter on derivative
-            if self.derivative_filter_tau > 0:
-                alpha = dt / (dt + self.derivative_filter_tau)
-                self.filtered_derivative = (alpha * raw_derivative + 
-                                          (1 - alpha) * self.filtered_derivative)
-                d_term = self.kd * self.filtered_derivative
-            else:
-                d_term = self.kd * raw_derivative
-        
-        self.prev_error = error
-        
-        return p_term + i_term + d_term
+        if dt != self.dt:
+            self.configure(dt)
+        return _pid_update(self.gains, self.alpha, self.pid_state, 0, error, dt)
 
 
 class CascadedController:
@@ -86,42 +170,43 @@ class CascadedController:
     Cascaded controller for altitude and attitude control
     Altitude controller outputs thrust
     Attitude controllers output torques
+    
+    Gains and PID states of the four loops are packed into two arrays
+    (rows LOOP_ALT ... LOOP_YAW) so the fused simulator tick can use them
     """
     
     def __init__(self):
         """Initialize cascaded control structure"""
-        # Altitude control (z)
-        self.alt_pid = PID(
-            kp=10.0, ki=2.0, kd=5.0,
-            integrator_limit=2.5,
-            derivative_filter_tau=0.02
-        )
-        
-        # Attitude control - VERY CONSERVATIVE
-        self.roll_pid = PID(
-            kp=2.0, ki=0.1, kd=1.0,  # Minimal gains
-            integrator_limit=0.1,     # Very small!
-            derivative_filter_tau=0.08
-        )
+        #            kp     ki    kd   integrator_limit  derivative_filter_tau
+        self.gains = np.array([
+            [10.0,  2.0,  5.0,  2.5,   0.02],   # Altitude control (z)
+            # Attitude control - VERY CONSERVATIVE (minimal gains, very small limits!)
+            [2.0,   0.1,  1.0,  0.1,   0.08],   # Roll
+            [2.0,   0.1,  1.0,  0.1,   0.08],   # Pitch
+            [1.0,   0.05, 0.5,  0.05,  0.08],   # Yaw
+        ])
         
-        self.pitch_pid = PID(
-            kp=2.0, ki=0.1, kd=1.0,  # Minimal gains
-            integrator_limit=0.1,     # Very small!
-            derivative_filter_tau=0.08
-        )
+        # State: [integral, prev_error, filtered_derivative, first_call]
+        self.pid_state = np.zeros((4, 4))
+        self.pid_state[:, 3] = 1.0
         
-        self.yaw_pid = PID(
-            kp=1.0, ki=0.05, kd=0.5,  # Minimal gains
-            integrator_limit=0.05,    # Very small!
-            derivative_filter_tau=0.08
-        )
+        # Derivative filter coefficients for the configured time step
+        self.dt = None
+        self.alpha = np.ones(4)
+
+    def configure(self, dt):
+        """
+        Precompute the derivative filter coefficients alpha = dt / (dt + tau)
+        Called automatically when the update methods see a new dt; call again
+        after changing the tau column of gains
+        """
+        self.dt = dt
+        self.alpha[:] = derivative_filter_alpha(self.gains[:, 4], dt)
 
     def reset(self):
         """Reset all controllers"""
-        self.alt_pid.reset()
-        self.roll_pid.reset()
-        self.pitch_pid.reset()
-        self.yaw_pid.reset()
+        self.pid_state[:] = 0.0
+        self.pid_state[:, 3] = 1.0
 
     def update_altitude(self, z_ref, z_actual, vz_actual, mass, g, dt):
         """
@@ -130,9 +215,12 @@ class CascadedController:
         Returns:
             thrust command
         """
+        if dt != self.dt:
+            self.configure(dt)
         z_err = z_ref - z_actual
         # Velocity damping term
-        alt_cmd = self.alt_pid.update(z_err - 0.2 * vz_actual, dt)
+        alt_cmd = _pid_update(self.gains, self.alpha, self.pid_state, LOOP_ALT,
+                              z_err - 0.2 * vz_actual, dt)
         thrust = mass * g + alt_cmd
         return thrust
 
@@ -144,12 +232,170 @@ class CascadedController:
         Returns:
             (torque_roll, torque_pitch, torque_yaw)
         """
+        if dt != self.dt:
+            self.configure(dt)
         roll_err = roll_ref - roll_actual
         pitch_err = pitch_ref - pitch_actual
         yaw_err = yaw_ref - yaw_actual
         
-        torque_roll = self.roll_pid.update(roll_err, dt)
-        torque_pitch = self.pitch_pid.update(pitch_err, dt)
-        torque_yaw = self.yaw_pid.update(yaw_err, dt)
+        gains, alpha, pid_state = self.gains, self.alpha, self.pid_state
+        torque_roll = _pid_update(gains, alpha, pid_state, LOOP_ROLL, roll_err, dt)
+        torque_pitch = _pid_update(gains, alpha, pid_state, LOOP_PITCH, pitch_err, dt)
+        torque_yaw = _pid_update(gains, alpha, pid_state, LOOP_YAW, yaw_err, dt)
         
-        return torque_roll, torque_pitch, torque_yaw
\ No newline at end of file
+        return torque_roll, torque_pitch, torque_yaw
+
+
+def _take(value, idx):
+    """Select idx from a per-loop array, pass scalars through unchanged"""
+    return value[idx] if np.ndim(value) else value
+
+
+class BatchedPID:
+    """
+    PID controller evaluated elementwise over N independent loops
+    Gains may be scalars or (N,) arrays
+    """
+
+    def __init__(self, num_loops, kp, ki, kd, integrator_limit=None, derivative_filter_tau=0.0):
+        """
+        Initialize batched PID controller
+
+        Args:
+            num_loops: Number of loops N
+            kp, ki, kd: Gains
+            integrator_limit: Limit for integral term (anti-windup)
+            derivative_filter_tau: Low-pass filter time constant for derivative
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.integrator_limit = np.inf if integrator_limit is None else integrator_limit
+        self.derivative_filter_tau = derivative_filter_tau
+
+        # State
+        self.integral = np.zeros(num_loops)
+        self.prev_error = np.zeros(num_loops)
+        self.filtered_derivative = np.zeros(num_loops)
+        self.first_call = np.ones(num_loops, dtype=bool)
+
+        # Derivative filter coefficients for the configured time step
+        self.dt = None
+        self.alpha = 1.0
+
+    @classmethod
+    def from_gains(cls, gains, num_loops):
+        """Replicate one packed gain row [kp, ki, kd, limit, tau] over N loops"""
+        kp, ki, kd, integrator_limit, derivative_filter_tau = gains
+        return cls(num_loops, kp, ki, kd,
+                   integrator_limit=integrator_limit,
+                   derivative_filter_tau=derivative_filter_tau)
+
+    def configure(self, dt):
+        """
+        Precompute the derivative filter coefficients for a fixed time step
+        Called automatically when update() sees a new dt; call again after
+        changing derivative_filter_tau
+        """
+        self.dt = dt
+        self.alpha = derivative_filter_alpha(self.derivative_filter_tau, dt)
+
+    def reset(self, idx=slice(None)):
+        """Reset controller state of the selected loops"""
+        self.integral[idx] = 0.0
+        self.prev_error[idx] = 0.0
+        self.filtered_derivative[idx] = 0.0
+        self.first_call[idx] = True
+
+    def update(self, error, dt, idx=slice(None)):
+        """
+        Update the loops selected by idx
+
+        Args:
+            error: Current errors, one per selected loop
+            dt: Time step
+            idx: Slice or index array of the loops to update
+
+        Returns:
+            Control outputs, one per selected loop
+        """
+        if dt != self.dt:
+            self.configure(dt)
+        kd = _take(self.kd, idx)
+        limit = _take(self.integrator_limit, idx)
+        alpha = _take(self.alpha, idx)
+
+        # Integral term with anti-windup
+        integral = np.clip(self.integral[idx] + error * dt, -limit, limit)
+        self.integral[idx] = integral
+
+        # Derivative term with filtering (alpha == 1 means no filtering)
+        first = self.first_call[idx]
+        raw_derivative = (error - self.prev_error[idx]) / dt if dt > 0 else np.zeros_like(error)
+        filtered = np.where(first, self.filtered_derivative[idx],
+                            alpha * raw_derivative + (1 - alpha) * self.filtered_derivative[idx])
+        self.filtered_derivative[idx] = filtered
+        d_term = np.where(first, 0.0, kd * filtered)
+
+        self.first_call[idx] = False
+        self.prev_error[idx] = error
+
+        return _take(self.kp, idx) * error + _take(self.ki, idx) * integral + d_term
+
+
+class BatchedCascadedController:
+    """
+    CascadedController replicated over N vehicles
+    """
+
+    def __init__(self, num_drones, template=None):
+        """
+        Initialize batched cascaded control structure
+
+        Args:
+            num_drones: Number of vehicles N
+            template: CascadedController whose gains are replicated (default gains if None)
+        """
+        template = template or CascadedController()
+        self.alt_pid = BatchedPID.from_gains(template.gains[LOOP_ALT], num_drones)
+        self.roll_pid = BatchedPID.from_gains(template.gains[LOOP_ROLL], num_drones)
+        self.pitch_pid = BatchedPID.from_gains(template.gains[LOOP_PITCH], num_drones)
+        self.yaw_pid = BatchedPID.from_gains(template.gains[LOOP_YAW], num_drones)
+
+    def configure(self, dt):
+        """Precompute the derivative filter coefficients of all loops for dt"""
+        self.alt_pid.configure(dt)
+        self.roll_pid.configure(dt)
+        self.pitch_pid.configure(dt)
+        self.yaw_pid.configure(dt)
+
+    def reset(self, idx=slice(None)):
+        """Reset all controllers of the selected vehicles"""
+        self.alt_pid.reset(idx)
+        self.roll_pid.reset(idx)
+        self.pitch_pid.reset(idx)
+        self.yaw_pid.reset(idx)
+
+    def update_altitude(self, z_ref, z_actual, vz_actual, mass, g, dt, idx=slice(None)):
+        """
+        Altitude control with feedforward velocity damping
+
+        Returns:
+            thrust commands
+        """
+        z_err = z_ref - z_actual
+        alt_cmd = self.alt_pid.update(z_err - 0.2 * vz_actual, dt, idx)
+        return mass * g + alt_cmd
+
+    def update_attitude(self, roll_ref, pitch_ref, yaw_ref,
+                        roll_actual, pitch_actual, yaw_actual, dt, idx=slice(None)):
+        """
+        Attitude control (roll, pitch, yaw)
+
+        Returns:
+            (torque_roll, torque_pitch, torque_yaw) arrays
+        """
+        torque_roll = self.roll_pid.update(roll_ref - roll_actual, dt, idx)
+        torque_pitch = self.pitch_pid.update(pitch_ref - pitch_actual, dt, idx)
+        torque_yaw = self.yaw_pid.update(yaw_ref - yaw_actual, dt, idx)
+        return torque_roll, torque_pitch, torque_yaw
@@ -3,8 +3,102 @@
 Quadcopter Simulator - integrates physics, control, and state management
 """
 
-from Quadcopter import Quadcopter
-from pid_controller import CascadedController
+import numpy as np
+from numba import njit, prange
+from Quadcopter import (Quadcopter, Integrator, BatchedQuadcopter, BatchState,
+                        IDX_X, IDX_Z, IDX_VZ, IDX_ROLL, IDX_PITCH, IDX_YAW,
+                        IDX_THRUST, RK4_MAX_DT,
+                        STATE_SIZE, STATE_KEYS, _step_euler, _step_rk4, _apply_limits)
+from pid_controller import (CascadedController, BatchedCascadedController, _pid_update,
+                            derivative_filter_alpha, LOOP_ALT, LOOP_ROLL, LOOP_PITCH, LOOP_YAW)
+from math_utils import FASTMATH
+from drone_state import DroneState
+
+
+# Extended state layout: quadcopter state followed by references, errors and sim info
+IDX_Z_REF, IDX_ROLL_REF, IDX_PITCH_REF, IDX_YAW_REF = 16, 17, 18, 19
+IDX_Z_ERR, IDX_ROLL_ERR, IDX_PITCH_ERR, IDX_YAW_ERR = 20, 21, 22, 23
+IDX_SIM_TIME, IDX_STEP_COUNT = 24, 25
+EXTENDED_STATE_SIZE = 26
+EXTENDED_STATE_KEYS = STATE_KEYS + (
+    "z_ref", "roll_ref", "pitch_ref", "yaw_ref",
+    "z_err", "roll_err", "pitch_err", "yaw_err",
+    "sim_time", "step_count")
+
+# State log: every LOG_INTERVAL-th step, rows of [sim_time, state...]
+LOG_INTERVAL = 4
+LOG_CAPACITY = 5000
+
+
+@njit(fastmath=FASTMATH, boundscheck=False, nogil=True, cache=True)
+def _single_tick(dyn, ctrl, gains, alpha, pid_state, refs, params, bounds, dt, use_rk4):
+    """
+    One fused control + physics step of one vehicle (in place)
+    
+    Args:
+        dyn: The 12 dynamic states
+        ctrl: Control inputs [thrust, torque_roll, torque_pitch, torque_yaw] (output)
+        gains, alpha, pid_state: Packed CascadedController arrays
+        refs: [z_ref, roll_ref, pitch_ref, yaw_ref]
+        params: Quadcopter parameter array
+        bounds: Quadcopter state bounds (2, 12)
+        dt: Time step
+        use_rk4: Integrate with RK4 instead of Euler
+    """
+    # Altitude control loop (with velocity damping)
+    z_err = refs[0] - dyn[IDX_Z]
+    alt_cmd = _pid_update(gains, alpha, pid_state, LOOP_ALT, z_err - 0.2 * dyn[IDX_VZ], dt)
+    
+    # Attitude control loops
+    torque_roll = _pid_update(gains, alpha, pid_state, LOOP_ROLL, refs[1] - dyn[IDX_ROLL], dt)
+    torque_pitch = _pid_update(gains, alpha, pid_state, LOOP_PITCH, refs[2] - dyn[IDX_PITCH], dt)
+    torque_yaw = _pid_update(gains, alpha, pid_state, LOOP_YAW, refs[3] - dyn[IDX_YAW], dt)
+    
+    # Apply control inputs
+    ctrl[0] = max(0.0, params[0] * params[1] + alt_cmd)
+    ctrl[1] = torque_roll
+    ctrl[2] = torque_pitch
+    ctrl[3] = torque_yaw
+    
+    # Advance physics
+    if use_rk4:
+        _step_rk4(dyn, ctrl, params, bounds, dt)
+    else:
+        _step_euler(dyn, ctrl, params, bounds, dt)
+    return dyn
+
+
+@njit(fastmath=FASTMATH, boundscheck=False, nogil=True, cache=True)
+def _sim_tick(state, gains, alpha, pid_state, refs, params, bounds, dt, use_rk4):
+    """
+    One fused control + physics step (in place)
+    state is the full Quadcopter state array; controls are written to it as well
+    """
+    _single_tick(state[:IDX_THRUST], state[IDX_THRUST:], gains, alpha, pid_state,
+                 refs, params, bounds, dt, use_rk4)
+    return state
+
+
+@njit(fastmath=FASTMATH, boundscheck=False, parallel=True, cache=True)
+def _batched_tick(state, ctrl, gains, alpha, pid_state, refs, params, bounds, active, dt):
+    """
+    _single_tick (Euler) for every active vehicle, rows spread over all cores
+    
+    Args:
+        state: (N, 12) vehicle states
+        ctrl: (N, 4) control inputs (output)
+        gains, alpha, pid_state: (N, 4, 5), (N, 4), (N, 4, 4) packed controller arrays
+        refs: (N, 4) references [z_ref, roll_ref, pitch_ref, yaw_ref]
+        params: (N, 5) physical parameters
+        bounds: (2, 12) state bounds
+        active: (N,) bool mask of vehicles to advance
+        dt: Time step
+    """
+    for i in prange(state.shape[0]):
+        if active[i]:
+            _single_tick(state[i], ctrl[i], gains[i], alpha[i], pid_state[i], refs[i],
+                         params[i], bounds, dt, False)
+    return state
 
 
 class QuadcopterSimulator:
@@ -12,7 +106,8 @@ class QuadcopterSimulator:
     Main simulator that combines quadcopter dynamics with control algorithms
     """
     
-    def __init__(self, mass=1.0, length=0.3, Ixx=0.01, Iyy=0.01, Izz=0.02):
+    def __init__(self, mass=1.0, length=0.3, Ixx=0.01, Iyy=0.01, Izz=0.02,
+                 integrator=Integrator.EULER):
         """
         Initialize simulator
         
@@ -20,10 +115,12 @@ class QuadcopterSimulator:
             mass: Vehicle mass (kg)
             length: Arm length (m)
             Ixx, Iyy, Izz: Moments of inertia
+            integrator: Integration scheme for the physics step
         """
         # Physical model
         self.quad = Quadcopter(mass=mass, length=length, 
-                              Ixx=Ixx, Iyy=Iyy, Izz=Izz)
+                              Ixx=Ixx, Iyy=Iyy, Izz=Izz,
+                              integrator=integrator)
         
         # Control system
         self.controller = CascadedController()
@@ -38,8 +135,14 @@ class QuadcopterSimulator:
         self.sim_time = 0.0
         self.step_count = 0
         
-        # Data logging
-        self.logged_states = []
+        # Data logging (ring buffer, _log_head counts rows ever written)
+        self._log_buf = np.empty((LOG_CAPACITY, 1 + STATE_SIZE), dtype=np.float32)
+        self._log_head = 0
+        
+        # Preallocated buffers for references and get_extended_state()
+        self._refs = np.zeros(4)
+        self._extended_state = np.zeros(EXTENDED_STATE_SIZE)
+        self._drone_state = DroneState()
 
     def set_references(self, roll_ref, pitch_ref, yaw_ref, z_ref):
         """Update reference values from user input or auto-pilot"""
@@ -53,48 +156,97 @@ class QuadcopterSimulator:
         Execute one simulation step
         
         Args:
-            dt: Time step (seconds)
+            dt: Time step (seconds), at most RK4_MAX_DT with Integrator.RK4
             
         Returns:
-            Current state dictionary
+            Current state array (live view, see Quadcopter.get_state)
         """
-        # Get current state
-        state = self.quad.get_state()
+        # Control loops and physics in one compiled call
+        refs = self._refs
+        refs[0] = self.z_ref
+        refs[1] = self.roll_ref
+        refs[2] = self.pitch_ref
+        refs[3] = self.yaw_ref
+        quad = self.quad
+        controller = self.controller
+        use_rk4 = quad.integrator is Integrator.RK4
+        if dt != controller.dt:
+            if use_rk4 and dt > RK4_MAX_DT:
+                raise ValueError(f"RK4 closed loop is unstable at dt={dt}, "
+                                 f"use dt <= {RK4_MAX_DT} or Integrator.EULER")
+            controller.configure(dt)
+        state = _sim_tick(quad.state, controller.gains, controller.alpha, controller.pid_state,
+                          refs, quad.params, quad.bounds, dt, use_rk4)
         
-        # Altitude control loop
-        thrust = self.controller.update_altitude(
-            self.z_ref, state["z"], state["vz"],
-            self.quad.mass, self.quad.g, dt
-        )
+        self._end_step(self.sim_time + dt, state)
+        return state
+
+    def _end_step(self, sim_time, state):
+        """Advance the clock and step counter, logging every LOG_INTERVAL-th step"""
+        # Update simulation time
+        self.sim_time = sim_time
+        self.step_count += 1
         
-        # Attitude control loops
-        torque_roll, torque_pitch, torque_yaw = self.controller.update_attitude(
-            self.roll_ref, self.pitch_ref, self.yaw_ref,
-            state["roll"], state["pitch"], state["yaw"], dt
-        )
+        # Log state if needed
+        if self.step_count % LOG_INTERVAL == 0:  # Log every 4th step to save memory
+            row = self._log_buf[self._log_head % LOG_CAPACITY]
+            row[0] = sim_time
+            row[1:] = state
+            self._log_head += 1
+
+    def step_until(self, t_target):
+        """
+        Advance the closed loop to t_target with the adaptive LSODA integrator
+        (requires numbalsoda). Meant to be called once per rendered frame;
+        references are held constant over the interval.
         
-        # Apply control inputs to quadcopter
-        self.quad.set_control(
-            torque_roll=torque_roll,
-            torque_pitch=torque_pitch,
-            torque_yaw=torque_yaw,
-            thrust=thrust
-        )
+        The PID integrators and derivative filters are integrated as extra ODE
+        states and written back to the controller, so step() and step_until()
+        can be mixed.
         
-        # Advance physics simulation
-        self.quad.step(dt)
+        Args:
+            t_target: Simulation time to advance to (seconds)
+            
+        Returns:
+            Current state array (live view, see Quadcopter.get_state)
+        """
+        import lsoda_integrator as ode
         
-        # Update simulation time
-        self.sim_time += dt
-        self.step_count += 1
+        quad = self.quad
+        if t_target <= self.sim_time:
+            return quad.get_state()
         
-        # Log state if needed
-        if self.step_count % 4 == 0:  # Log every 4th step to save memory
-            self.logged_states.append((self.sim_time, self.quad.get_state()))
-            if len(self.logged_states) > 5000:  # Keep last 5000 states
-                self.logged_states.pop(0)
+        gains = self.controller.gains
+        pid_state = self.controller.pid_state
+        data = np.empty(ode.DATA_SIZE)
+        data[:ode.IDX_DATA_REFS] = quad.params
+        data[ode.IDX_DATA_REFS:ode.IDX_DATA_GAINS] = (
+            self.z_ref, self.roll_ref, self.pitch_ref, self.yaw_ref)
+        data[ode.IDX_DATA_GAINS:] = gains.ravel()
+        
+        # Map the discrete controller state onto the continuous one:
+        # filter state f such that kd * (e - f) / tau is the current D term
+        tau = np.maximum(gains[:, 4], ode.MIN_FILTER_TAU)
+        u0 = np.empty(ode.ODE_SIZE)
+        u0[:IDX_THRUST] = quad.state[:IDX_THRUST]
+        u0[ode.IDX_INTEGRAL:ode.IDX_FILTER] = pid_state[:, 0]
+        err = ode.loop_errors(u0, data)
+        u0[ode.IDX_FILTER:] = err - pid_state[:, 2] * tau * (1.0 - pid_state[:, 3])
+        
+        u = ode.integrate(u0, self.sim_time, t_target, data)
+        
+        # Write back physics (with the usual limits) and controller state
+        quad.state[:IDX_THRUST] = u[:IDX_THRUST]
+        _apply_limits(quad.state[:IDX_THRUST], quad.bounds)
+        quad.state[IDX_THRUST:] = ode.controls(u, data)
+        err = ode.loop_errors(u, data)
+        pid_state[:, 0] = np.clip(u[ode.IDX_INTEGRAL:ode.IDX_FILTER], -gains[:, 3], gains[:, 3])
+        pid_state[:, 1] = err
+        pid_state[:, 2] = (err - u[ode.IDX_FILTER:]) / tau
+        pid_state[:, 3] = 0.0
         
-        return self.quad.get_state()
+        self._end_step(t_target, quad.state)
+        return quad.get_state()
 
     def reset(self):
         """Reset simulation to initial conditions"""
@@ -102,30 +254,231 @@ class QuadcopterSimulator:
         self.controller.reset()
         self.sim_time = 0.0
         self.step_count = 0
-        self.logged_states = []
+        self._log_head = 0
 
     def get_extended_state(self):
         """
         Get extended state including references and errors
+        
+        Returns:
+            Preallocated array (layout IDX_X ... IDX_STEP_COUNT), overwritten
+            by the next call
         """
-        state = self.quad.get_state()
-        state["z_ref"] = self.z_ref
-        state["roll_ref"] = self.roll_ref
-        state["pitch_ref"] = self.pitch_ref
-        state["yaw_ref"] = self.yaw_ref
+        ext = self._extended_state
+        state = self.quad.state
+        ext[:STATE_SIZE] = state
+        ext[IDX_Z_REF] = self.z_ref
+        ext[IDX_ROLL_REF] = self.roll_ref
+        ext[IDX_PITCH_REF] = self.pitch_ref
+        ext[IDX_YAW_REF] = self.yaw_ref
         
         # Calculate errors
-        state["z_err"] = self.z_ref - state["z"]
-        state["roll_err"] = self.roll_ref - state["roll"]
-        state["pitch_err"] = self.pitch_ref - state["pitch"]
-        state["yaw_err"] = self.yaw_ref - state["yaw"]
+        ext[IDX_Z_ERR] = self.z_ref - state[IDX_Z]
+        ext[IDX_ROLL_ERR] = self.roll_ref - state[IDX_ROLL]
+        ext[IDX_PITCH_ERR] = self.pitch_ref - state[IDX_PITCH]
+        ext[IDX_YAW_ERR] = self.yaw_ref - state[IDX_YAW]
         
         # Simulation info
-        state["sim_time"] = self.sim_time
-        state["step_count"] = self.step_count
+        ext[IDX_SIM_TIME] = self.sim_time
+        ext[IDX_STEP_COUNT] = self.step_count
         
+        return ext
+
+    def drone_state(self):
+        """
+        Displayed state (for visualization)
+        
+        Returns:
+            The simulator's DroneState, updated in place: the same object is
+            returned (and overwritten) by every call
+        """
+        ds = self._drone_state
+        state = self.quad.state
+        ds.x, ds.y, ds.z, ds.vx, ds.vy, ds.vz, ds.roll, ds.pitch, ds.yaw = \
+            state[IDX_X:IDX_YAW + 1].tolist()
+        ds.thrust = float(state[IDX_THRUST])
+        ds.roll_ref = float(self.roll_ref)
+        ds.pitch_ref = float(self.pitch_ref)
+        ds.z_ref = float(self.z_ref)
+        ds.sim_time = float(self.sim_time)
+        return ds
+
+    def extended_state_as_dict(self):
+        """Extended state as a dictionary (for visualization)"""
+        state = dict(zip(EXTENDED_STATE_KEYS, self.get_extended_state().tolist()))
+        state["step_count"] = self.step_count
         return state
 
     def get_log_entries(self, num_entries=10):
-        """Get last N logged states"""
-        return self.logged_states[-num_entries:]
+        """
+        Get last N logged states, oldest first
+        
+        Returns:
+            (n, 17) float32 array of [sim_time, state...] rows; a view of the
+            log unless the requested range wraps around the ring
+        """
+        n = min(num_entries, self._log_head, LOG_CAPACITY)
+        end = self._log_head % LOG_CAPACITY
+        start = end - n
+        if start >= 0:
+            return self._log_buf[start:end]
+        return np.concatenate((self._log_buf[start:], self._log_buf[:end]))
+
+
+class BatchedQuadcopterSimulator:
+    """
+    Simulates N quadcopters at once with structure-of-arrays state
+    Intended for Monte-Carlo runs, parameter sweeps and RL rollouts
+    """
+
+    BACKENDS = ("numpy", "numba", "torch")
+
+    def __init__(self, num_drones, mass=1.0, Ixx=0.01, Iyy=0.01, Izz=0.02,
+                 backend="numpy", device=None):
+        """
+        Initialize batched simulator
+
+        Args:
+            num_drones: Number of vehicles N
+            mass: Vehicle mass (kg), scalar or (N,) array
+            Ixx, Iyy, Izz: Moments of inertia, scalars or (N,) arrays
+            backend: "numpy" (vectorized ufuncs), "numba" (compiled, one
+                vehicle per core) or "torch"
+            device: Torch device for the torch backend (default: CUDA if available)
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {self.BACKENDS}")
+        self.backend = backend
+        self.num_drones = num_drones
+
+        # Simulation statistics
+        self.sim_time = 0.0
+        self.step_count = 0
+        self._dt = None
+
+        if backend == "torch":
+            from torch_backend import TorchBatchedEngine
+            self._engine = TorchBatchedEngine(num_drones, mass, Ixx, Iyy, Izz,
+                                              CascadedController(), device=device)
+            self.active = self._engine.active
+            return
+
+        # Physical model and control system
+        self.quads = BatchedQuadcopter(num_drones, mass=mass, Ixx=Ixx, Iyy=Iyy, Izz=Izz)
+        if backend == "numba":
+            # Packed CascadedController arrays, one block per vehicle; overwrite
+            # rows of gains for gain sweeps (call configure() after changing tau)
+            template = CascadedController()
+            self.gains = np.repeat(template.gains[None], num_drones, axis=0)
+            self.pid_state = np.repeat(template.pid_state[None], num_drones, axis=0)
+            self.alpha = np.ones((num_drones, 4))
+        else:
+            self.controller = BatchedCascadedController(num_drones)
+
+        # Reference (setpoint) values, one per vehicle, as views of one packed
+        # (N, 4) array [z_ref, roll_ref, pitch_ref, yaw_ref]
+        self.refs = np.zeros((num_drones, 4))
+        self.refs[:, 0] = 2.5
+        self.z_ref = self.refs[:, 0]
+        self.roll_ref = self.refs[:, 1]
+        self.pitch_ref = self.refs[:, 2]
+        self.yaw_ref = self.refs[:, 3]
+
+        # Vehicles advanced by step(); inactive ones are frozen
+        self.active = np.ones(num_drones, dtype=bool)
+
+    @property
+    def state(self):
+        """BatchState of all vehicles (backed by a tensor for the torch backend)"""
+        if self.backend == "torch":
+            return BatchState(self._engine.state)
+        return self.quads.state
+
+    def set_references(self, roll_ref, pitch_ref, yaw_ref, z_ref):
+        """Update reference values (scalars or (N,) arrays)"""
+        if self.backend == "torch":
+            self._engine.set_references(roll_ref, pitch_ref, yaw_ref, z_ref)
+            return
+        self.roll_ref[:] = roll_ref
+        self.pitch_ref[:] = pitch_ref
+        self.yaw_ref[:] = yaw_ref
+        self.z_ref[:] = z_ref
+
+    def configure(self, dt):
+        """
+        Precompute the derivative filter coefficients for a fixed time step
+        Called automatically when step() sees a new dt; call again after
+        changing the derivative filter time constants of the controllers
+        """
+        self._dt = dt
+        if self.backend == "torch":
+            self._engine.configure(dt)
+        elif self.backend == "numba":
+            self.alpha[:] = derivative_filter_alpha(self.gains[:, :, 4], dt)
+        else:
+            self.controller.configure(dt)
+
+    def step(self, dt):
+        """
+        Execute one simulation step for all active vehicles
+
+        Args:
+            dt: Time step (seconds)
+
+        Returns:
+            (N, 12) state array (tensor for the torch backend)
+        """
+        if dt != self._dt:
+            self.configure(dt)
+
+        if self.backend == "torch":
+            self.sim_time += dt
+            self.step_count += 1
+            return self._engine.step(dt)
+
+        if self.backend == "numba":
+            _batched_tick(self.quads.state.data, self.quads.ctrl, self.gains, self.alpha,
+                          self.pid_state, self.refs, self.quads.params, self.quads.bounds,
+                          self.active, dt)
+            self.sim_time += dt
+            self.step_count += 1
+            return self.quads.state.data
+
+        idx = slice(None) if self.active.all() else np.flatnonzero(self.active)
+        state = self.quads.state.data[idx]
+        mass = self.quads.params[idx, 0]
+        g = self.quads.params[idx, 1]
+
+        # Altitude control loop
+        thrust = self.controller.update_altitude(
+            self.z_ref[idx], state[:, IDX_Z], state[:, IDX_VZ], mass, g, dt, idx
+        )
+
+        # Attitude control loops
+        torque_roll, torque_pitch, torque_yaw = self.controller.update_attitude(
+            self.roll_ref[idx], self.pitch_ref[idx], self.yaw_ref[idx],
+            state[:, IDX_ROLL], state[:, IDX_PITCH], state[:, IDX_YAW], dt, idx
+        )
+
+        # Apply control inputs and advance physics
+        self.quads.set_control(torque_roll, torque_pitch, torque_yaw, thrust, idx)
+        self.quads.step(dt, idx)
+
+        self.sim_time += dt
+        self.step_count += 1
+        return self.quads.state.data
+
+    def reset(self):
+        """Reset all vehicles to initial conditions"""
+        self.sim_time = 0.0
+        self.step_count = 0
+        if self.backend == "torch":
+            self._engine.reset()
+            return
+        self.quads.reset()
+        if self.backend == "numba":
+            self.pid_state[:] = 0.0
+            self.pid_state[:, :, 3] = 1.0
+        else:
+            self.controller.reset()
+        self.active[:] = True
@@ -0,0 +1,178 @@
+# torch_backend.py
+"""
+PyTorch backend for BatchedQuadcopterSimulator (CPU or CUDA)
+"""
+
+import math
+import torch
+
+from Quadcopter import (IDX_Z, IDX_VZ, IDX_ROLL, IDX_PITCH, IDX_YAW, PARAMS_SIZE,
+                        GRAVITY, INITIAL_Z, DEFAULT_MAX_ANGLE, DEFAULT_MAX_VEL,
+                        DEFAULT_MAX_POS, state_bounds)
+from pid_controller import derivative_filter_alpha
+
+
+def _tick(state, pid_state, gains, alpha, refs, params, bounds, active, dt):
+    """
+    One control + physics step for all vehicles
+
+    Args:
+        state: (N, 12) vehicle states
+        pid_state: (N, 4, 4) PID states
+        gains: (N, 4, 5) per-vehicle PID gains
+        alpha: (N, 4) derivative filter coefficients for dt
+        refs: (N, 4) references [z_ref, roll_ref, pitch_ref, yaw_ref]
+        params: (N, 5) physical parameters (Quadcopter layout)
+        bounds: (2, 12) state bounds (Quadcopter layout)
+        active: (N,) bool mask of vehicles to advance
+        dt: Time step
+
+    Returns:
+        (new_state, new_pid_state)
+    """
+    # ---- Cascaded PID (altitude, roll, pitch, yaw) ----
+    err = torch.stack((
+        refs[:, 0] - state[:, IDX_Z] - 0.2 * state[:, IDX_VZ],
+        refs[:, 1] - state[:, IDX_ROLL],
+        refs[:, 2] - state[:, IDX_PITCH],
+        refs[:, 3] - state[:, IDX_YAW],
+    ), dim=1)
+    kp, ki, kd, limit, _ = gains.unbind(-1)
+    integral, prev_error, filtered, first = pid_state.unbind(-1)
+
+    # Integral term with anti-windup
+    integral = torch.minimum(torch.maximum(integral + err * dt, -limit), limit)
+
+    # Derivative term with filtering (alpha == 1 means no filtering)
+    is_first = first > 0.5
+    raw_derivative = (err - prev_error) / dt if dt > 0 else torch.zeros_like(err)
+    filtered = torch.where(is_first, filtered,
+                           alpha * raw_derivative + (1 - alpha) * filtered)
+    d_term = torch.where(is_first, torch.zeros_like(filtered), kd * filtered)
+
+    u = kp * err + ki * integral + d_term
+    new_pid_state = torch.stack((integral, err, filtered, torch.zeros_like(first)), dim=-1)
+
+    # ---- Dynamics (semi-implicit Euler, same as Quadcopter) ----
+    mass, g = params[:, 0], params[:, 1]
+    thrust = torch.clamp(mass * g + u[:, 0], min=0.0)
+
+    rates = state[:, 9:12] + u[:, 1:4] / params[:, 2:5] * dt
+    angles = state[:, 6:9] + rates * dt
+    roll, pitch, yaw = angles.unbind(1)
+
+    # One cos and one sin kernel over all three angles
+    cr, cp, cy = torch.cos(angles).unbind(1)
+    sr, sp, sy = torch.sin(angles).unbind(1)
+
+    # Thrust along the third column of the body-to-world rotation matrix
+    acc = torch.stack((
+        thrust * (cy * sp * cr + sy * sr) / mass,
+        thrust * (sy * sp * cr - cy * sr) / mass,
+        (thrust * cp * cr - mass * g) / mass,
+    ), dim=1)
+    vel = state[:, 3:6] + acc * dt
+    pos = state[:, 0:3] + vel * dt
+
+    # Wrap yaw, stop at the ground, then apply all limits at once
+    yaw = torch.remainder(yaw + math.pi, 2 * math.pi) - math.pi
+    vz = torch.where(pos[:, 2] < 0.0, torch.zeros_like(vel[:, 2]), vel[:, 2])
+    new_state = torch.stack((pos[:, 0], pos[:, 1], pos[:, 2], vel[:, 0], vel[:, 1], vz,
+                             roll, pitch, yaw,
+                             rates[:, 0], rates[:, 1], rates[:, 2]), dim=1)
+    new_state = torch.clamp(new_state, bounds[0], bounds[1])
+
+    # Inactive vehicles keep their state
+    new_state = torch.where(active[:, None], new_state, state)
+    new_pid_state = torch.where(active[:, None, None], new_pid_state, pid_state)
+    return new_state, new_pid_state
+
+
+class TorchBatchedEngine:
+    """
+    Holds all batched simulator state as tensors on one device
+    Nothing is copied back to the host during step()
+    """
+
+    def __init__(self, num_drones, mass, Ixx, Iyy, Izz, template,
+                 device=None, dtype=torch.float32, compile_step=True):
+        """
+        Initialize tensors
+
+        Args:
+            num_drones: Number of vehicles N
+            mass, Ixx, Iyy, Izz: Physical parameters, scalars or (N,) arrays
+            template: CascadedController whose gains are replicated per vehicle
+            device: Torch device (default: CUDA when available, else CPU)
+            dtype: Floating point type of all tensors
+            compile_step: Wrap the step in torch.compile
+        """
+        if device is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = torch.device(device)
+        self.num_drones = num_drones
+        opts = dict(device=self.device, dtype=dtype)
+
+        # Vehicle state and physical parameters
+        self.state = torch.zeros((num_drones, 12), **opts)
+        self.state[:, IDX_Z] = INITIAL_Z
+        self.params = torch.empty((num_drones, PARAMS_SIZE), **opts)
+        for col, value in enumerate((mass, GRAVITY, Ixx, Iyy, Izz)):
+            self.params[:, col] = torch.as_tensor(value, **opts)
+        self.bounds = torch.as_tensor(
+            state_bounds(DEFAULT_MAX_ANGLE, DEFAULT_MAX_VEL, DEFAULT_MAX_POS), **opts)
+
+        # Per-vehicle PID gains in the packed CascadedController layouts;
+        # overwrite rows for domain randomization (call configure() after
+        # changing tau)
+        gains = torch.as_tensor(template.gains, **opts)
+        self.gains = gains.expand(num_drones, 4, 5).clone()
+        self.pid_state = torch.zeros((num_drones, 4, 4), **opts)
+        self.pid_state[..., 3] = 1.0
+
+        # Derivative filter coefficients for the configured time step
+        self.dt = None
+        self.alpha = torch.ones((num_drones, 4), **opts)
+
+        # References [z_ref, roll_ref, pitch_ref, yaw_ref] and active mask
+        self.refs = torch.zeros((num_drones, 4), **opts)
+        self.refs[:, 0] = INITIAL_Z
+        self.active = torch.ones(num_drones, dtype=torch.bool, device=self.device)
+
+        if compile_step:
+            self._tick = torch.compile(_tick, mode="reduce-overhead", fullgraph=True)
+        else:
+            self._tick = _tick
+
+    def set_references(self, roll_ref, pitch_ref, yaw_ref, z_ref):
+        """Update reference values (scalars, arrays or tensors)"""
+        for col, value in enumerate((z_ref, roll_ref, pitch_ref, yaw_ref)):
+            self.refs[:, col] = torch.as_tensor(value, dtype=self.refs.dtype, device=self.device)
+
+    def configure(self, dt):
+        """
+        Precompute the derivative filter coefficients for a fixed time step
+        Called automatically when step() sees a new dt; call again after
+        changing the tau column of gains
+        """
+        self.dt = dt
+        tau = self.gains[..., 4].cpu().numpy()
+        self.alpha.copy_(torch.as_tensor(derivative_filter_alpha(tau, dt)))
+
+    def step(self, dt):
+        """Advance all active vehicles one step (in place)"""
+        if dt != self.dt:
+            self.configure(dt)
+        state, pid_state = self._tick(self.state, self.pid_state, self.gains, self.alpha,
+                                      self.refs, self.params, self.bounds, self.active, dt)
+        self.state.copy_(state)
+        self.pid_state.copy_(pid_state)
+        return self.state
+
+    def reset(self):
+        """Reset vehicles, controllers and active mask"""
+        self.state.zero_()
+        self.state[:, IDX_Z] = INITIAL_Z
+        self.pid_state.zero_()
+        self.pid_state[..., 3] = 1.0
+        self.active.fill_(True)
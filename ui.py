@@ -5,6 +5,13 @@ User interface and main application controller
 
 import pygame
 from enum import Enum
+from controller import read_key_mask
+from visualization import load_glyph_atlas, batch_blitter, UI_FONT_SMALL, UI_HIGHLIGHT_COLOR
+
+
+# Frame pacing: sleep until this many ms before the frame deadline, then
+# busy-wait the rest (SDL_Delay alone can overshoot by a scheduler slice)
+BUSY_WAIT_MS = 2
 
 
 class AppState(Enum):
@@ -37,25 +44,101 @@ class UserInterface:
         
         # Display
         self.screen = pygame.display.set_mode((width, height))
+        self._blits = batch_blitter(self.screen)
         self.clock = pygame.time.Clock()
+        self._frame_start = pygame.time.get_ticks()
         
         # Fonts
         self.font_title = pygame.font.SysFont("Arial", 32, bold=True)
         self.font_normal = pygame.font.SysFont("Arial", 16)
-        self.font_small = pygame.font.SysFont("Arial", 12)
+        self.font_small = pygame.font.SysFont(*UI_FONT_SMALL)
         
         # Colors
         self.BG_COLOR = (20, 20, 20)
         self.TEXT_COLOR = (255, 255, 255)
-        self.HIGHLIGHT_COLOR = (0, 200, 200)
+        self.HIGHLIGHT_COLOR = UI_HIGHLIGHT_COLOR
         self.BUTTON_COLOR = (60, 60, 60)
         self.BUTTON_HOVER = (100, 100, 100)
         self.BUTTON_ACTIVE = (0, 150, 150)
         
+        # Menu text, rendered and centered once
+        self._menu_title_surf = self.font_title.render(
+            "Quadcopter Motion Control", True, self.HIGHLIGHT_COLOR).convert_alpha()
+        self._menu_subtitle_surf = self.font_normal.render(
+            "Real-Time Systems Project", True, self.TEXT_COLOR).convert_alpha()
+        instructions = [
+            "CONTROLS:",
+            "SPACE - Increase Altitude",
+            "SHIFT - Decrease Altitude",
+            "W/S - Pitch Forward/Backward",
+            "A/D - Roll Left/Right",
+            "Q/E - Yaw Counter-Clockwise/Clockwise",
+            "P - Pause/Resume",
+            "R - Reset",
+            "ESC - Exit",
+            "",
+            "Press any key to start..."
+        ]
+        self._menu_blits = [
+            (self._menu_title_surf, (width//2 - self._menu_title_surf.get_width()//2, 100)),
+            (self._menu_subtitle_surf, (width//2 - self._menu_subtitle_surf.get_width()//2, 150)),
+        ]
+        y_pos = 250
+        for text in instructions:
+            if text:
+                surf = self.font_small.render(text, True, self.TEXT_COLOR).convert_alpha()
+                self._menu_blits.append((surf, (width//2 - surf.get_width()//2, y_pos)))
+            y_pos += 30
+        
+        # Pause overlay: translucent full-screen shade plus centered text
+        self._pause_overlay = pygame.Surface((width, height)).convert()
+        self._pause_overlay.set_alpha(200)
+        self._pause_overlay.fill((0, 0, 0))
+        self._pause_title_surf = self.font_title.render(
+            "PAUSED", True, self.HIGHLIGHT_COLOR).convert_alpha()
+        self._pause_resume_surf = self.font_normal.render(
+            "Press P to Resume", True, self.TEXT_COLOR).convert_alpha()
+        self._pause_blits = [
+            (self._pause_overlay, (0, 0)),
+            (self._pause_title_surf, (width//2 - self._pause_title_surf.get_width()//2, height//2 - 50)),
+            (self._pause_resume_surf, (width//2 - self._pause_resume_surf.get_width()//2, height//2 + 20)),
+        ]
+        
+        # Glyphs for the per-frame debug overlay
+        self._debug_atlas = load_glyph_atlas(self.font_small, UI_FONT_SMALL,
+                                             self.HIGHLIGHT_COLOR)
+        
         # Settings
         self.show_debug_info = False
         self.paused = False
         self.reset_requested = False
+        
+        # Control keys held down after the last handle_events (controller.KEY_BITS)
+        self.key_mask = 0
+        
+        # Event dispatch: handlers take (event, changes)
+        self._event_handlers = {
+            pygame.QUIT: self._on_quit,
+            pygame.KEYDOWN: self._on_keydown,
+            # Window contents lost: the next frame must be presented in full
+            pygame.WINDOWEXPOSED: self._on_expose,
+            pygame.WINDOWRESTORED: self._on_expose,
+            pygame.VIDEOEXPOSE: self._on_expose,
+        }
+        self._key_handlers = {
+            pygame.K_ESCAPE: self._on_quit,
+            pygame.K_p: self._on_pause_key,
+            pygame.K_r: self._on_reset_key,
+            pygame.K_F1: self._on_debug_key,
+        }
+        
+        # High-volume input events nothing here handles are dropped by SDL
+        # instead of being queued (held keys are read via get_pressed, which
+        # does not need KEYUP); window events stay allowed
+        pygame.event.set_blocked([pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN,
+                                  pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL,
+                                  pygame.ACTIVEEVENT, pygame.KEYUP,
+                                  pygame.TEXTINPUT, pygame.TEXTEDITING])
 
     def handle_events(self):
         """
@@ -68,88 +151,60 @@ class UserInterface:
             "pause_toggle": False,
             "reset": False,
             "quit": False,
-            "debug_toggle": False
+            "debug_toggle": False,
+            "redraw": False
         }
         
+        handlers = self._event_handlers
         for event in pygame.event.get():
-            # Window close
-            if event.type == pygame.QUIT:
-                self.running = False
-                changes["quit"] = True
-            
-            # Keyboard input
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    self.running = False
-                    changes["quit"] = True
-                
-                # Pause/Resume (P key)
-                elif event.key == pygame.K_p:
-                    self.paused = not self.paused
-                    changes["pause_toggle"] = True
-                
-                # Reset (R key)
-                elif event.key == pygame.K_r:
-                    changes["reset"] = True
-                
-                # Debug info toggle (F1)
-                elif event.key == pygame.K_F1:
-                    self.show_debug_info = not self.show_debug_info
-                    changes["debug_toggle"] = True
+            handler = handlers.get(event.type)
+            if handler:
+                handler(event, changes)
+        
+        # Held keys, read once per frame for the controller and the display
+        self.key_mask = read_key_mask()
         
         return changes
 
+    def _on_quit(self, event, changes):
+        """Window close or ESC"""
+        self.running = False
+        changes["quit"] = True
+
+    def _on_expose(self, event, changes):
+        """Window exposed or restored: request a full redraw"""
+        changes["redraw"] = True
+
+    def _on_keydown(self, event, changes):
+        """Dispatch a key press to its handler"""
+        handler = self._key_handlers.get(event.key)
+        if handler:
+            handler(event, changes)
+
+    def _on_pause_key(self, event, changes):
+        """Pause/Resume (P key)"""
+        self.paused = not self.paused
+        changes["pause_toggle"] = True
+
+    def _on_reset_key(self, event, changes):
+        """Reset (R key)"""
+        changes["reset"] = True
+
+    def _on_debug_key(self, event, changes):
+        """Debug info toggle (F1)"""
+        self.show_debug_info = not self.show_debug_info
+        changes["debug_toggle"] = True
+
     def draw_menu(self):
         """Draw main menu"""
         self.screen.fill(self.BG_COLOR)
-        
-        title = self.font_title.render("Quadcopter Motion Control", True, self.HIGHLIGHT_COLOR)
-        subtitle = self.font_normal.render("Real-Time Systems Project", True, self.TEXT_COLOR)
-        
-        self.screen.blit(title, (self.width//2 - title.get_width()//2, 100))
-        self.screen.blit(subtitle, (self.width//2 - subtitle.get_width()//2, 150))
-        
-        instructions = [
-            "CONTROLS:",
-            "SPACE - Increase Altitude",
-            "SHIFT - Decrease Altitude",
-            "W/S - Pitch Forward/Backward",
-            "A/D - Roll Left/Right",
-            "Q/E - Yaw Counter-Clockwise/Clockwise",
-            "P - Pause/Resume",
-            "R - Reset",
-            "ESC - Exit",
-            "",
-            "Press any key to start..."
-        ]
-        
-        y_pos = 250
-        for text in instructions:
-            if text:
-                surf = self.font_small.render(text, True, self.TEXT_COLOR)
-                self.screen.blit(surf, (self.width//2 - surf.get_width()//2, y_pos))
-            y_pos += 30
-        
+        self._blits(self._menu_blits)
         pygame.display.update()
 
     def draw_pause_overlay(self):
         """Draw pause overlay"""
-        # Semi-transparent overlay
-        overlay = pygame.Surface((self.width, self.height))
-        overlay.set_alpha(200)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
-        
-        # Pause text
-        pause_text = self.font_title.render("PAUSED", True, self.HIGHLIGHT_COLOR)
-        resume_text = self.font_normal.render("Press P to Resume", True, self.TEXT_COLOR)
-        
-        self.screen.blit(pause_text, 
-                        (self.width//2 - pause_text.get_width()//2, 
-                         self.height//2 - 50))
-        self.screen.blit(resume_text,
-                        (self.width//2 - resume_text.get_width()//2,
-                         self.height//2 + 20))
+        # Semi-transparent overlay and pause text, all prepared in __init__
+        self._blits(self._pause_blits)
 
     def draw_debug_info(self, sim_time, fps, step_count):
         """Draw debug information overlay"""
@@ -161,14 +216,17 @@ class UserInterface:
         ]
         
         y_pos = 10
+        seq = []
         for line in debug_lines:
-            text = self.font_small.render(line, True, self.HIGHLIGHT_COLOR)
-            self.screen.blit(text, (10, y_pos))
+            self._debug_atlas.layout(line, 10, y_pos, seq)
             y_pos += 20
+        self._blits(seq)
 
     def get_frame_rate(self, target_fps=20):
         """
         Get current frame rate and tick clock
+        Sleeps through most of the remaining frame time and busy-waits only
+        the last BUSY_WAIT_MS, for a precise frame period at low CPU cost
         
         Args:
             target_fps: Target frames per second
@@ -176,7 +234,11 @@ class UserInterface:
         Returns:
             Actual FPS
         """
-        self.clock.tick(target_fps)
+        remaining = 1000 // target_fps - (pygame.time.get_ticks() - self._frame_start)
+        if remaining > BUSY_WAIT_MS + 1:
+            pygame.time.wait(remaining - BUSY_WAIT_MS)
+        self.clock.tick_busy_loop(target_fps)
+        self._frame_start = pygame.time.get_ticks()
         return self.clock.get_fps()
 
     def is_running(self):
@@ -208,6 +270,7 @@ class SimulationConfig:
         self.dt = 0.05            # time step (50ms) - 20 Hz
         self.gravity = 9.81       # m/s^2
         self.max_sim_time = 600   # max simulation time (seconds)
+        self.use_lsoda = False    # adaptive LSODA physics between frames (needs numbalsoda)
         
         # Initial conditions
         self.initial_z = 2.5      # initial altitude (m)
@@ -3,8 +3,161 @@
 Visualization system for quadcopter FPV-style display
 """
 
+import os
+import json
 import pygame
 import math
+from functools import partial
+import numpy as np
+from controller import BIT_SPACE, BIT_SHIFT, BIT_W, BIT_S, BIT_A, BIT_D
+from drone_state import DroneState
+
+
+# Heading arrow head: barbs at +-2.5 rad from the heading direction
+C25 = math.cos(2.5)
+S25 = math.sin(2.5)
+
+# Radians to degrees (the factor math.degrees multiplies by)
+_RAD2DEG = 180.0 / math.pi
+
+# Keys shown in the input readout, in display order
+INPUT_LABELS = ((BIT_W, " [W↑]"), (BIT_S, " [S↓]"), (BIT_A, " [A←]"), (BIT_D, " [D→]"),
+                (BIT_SPACE, " [SP↑]"), (BIT_SHIFT, " [SH↓]"))
+INPUT_MASK = sum(1 << bit for bit, _ in INPUT_LABELS)
+
+# Telemetry panel rows: (fields of the panel's display key, color, format)
+STATUS_ROWS = (
+    (slice(0, 3), (0, 255, 0), "Alt: {:.2f}m  Ref: {:.2f}m  Vz: {:+.2f}m/s"),
+    (slice(3, 5), (100, 200, 255), "Pos: X={:+.1f}m  Y={:+.1f}m"),
+    (slice(5, 7), (255, 100, 100), "Roll: {:+6.1f}°  Ref: {:+6.1f}°"),
+    (slice(7, 9), (255, 100, 100), "Pitch: {:+6.1f}°  Ref: {:+6.1f}°"),
+    (slice(9, 12), (200, 200, 200), "Yaw: {:+6.1f}°  Thrust: {:.2f}N  Time: {:.2f}s"),
+)
+
+# Characters pre-rendered into every glyph atlas (others are added on first use)
+ATLAS_CHARS = "".join(chr(c) for c in range(32, 127)) + "°"
+
+# SysFont (name, size, bold) of the Visualizer fonts
+FONT_SMALL = ("monospace", 14, False)
+FONT_MEDIUM = ("monospace", 16, False)
+FONT_LARGE = ("monospace", 20, True)
+# UserInterface small font and highlight color (debug overlay)
+UI_FONT_SMALL = ("Arial", 12, False)
+UI_HIGHLIGHT_COLOR = (0, 200, 200)
+
+# Colors of the dynamic text drawn with FONT_SMALL (besides STATUS_ROWS)
+HISTORY_COLOR = (0, 255, 200)
+MAP_TEXT_COLOR = (100, 255, 100)
+VH_COLORS = ((0, 255, 100), (255, 200, 0), (255, 100, 0))         # slow, medium, fast
+VZ_COLORS = ((100, 200, 255), (255, 100, 100), (100, 255, 100))   # climb, sink, level
+
+# Pre-rasterized glyph atlases, written by make_font_atlas.py: font -> colors
+# of the dynamic text drawn with it
+BITMAP_FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+BITMAP_FONTS = {
+    FONT_SMALL: tuple(dict.fromkeys(
+        tuple(color for _, color, _ in STATUS_ROWS)
+        + (HISTORY_COLOR, MAP_TEXT_COLOR) + VH_COLORS + VZ_COLORS)),
+    UI_FONT_SMALL: (UI_HIGHLIGHT_COLOR,),
+}
+
+
+def batch_blitter(surface):
+    """
+    Callable drawing a sequence of (source, dest) pairs onto surface in one
+    call: Surface.fblits where available (pygame-ce), else Surface.blits
+    without building the list of changed rects
+    """
+    fblits = getattr(surface, "fblits", None)
+    if fblits is not None:
+        return fblits
+    return partial(surface.blits, doreturn=False)
+
+
+class GlyphAtlas:
+    """
+    Glyphs of one font in one color, rendered once and blitted per character
+    Dynamic text then costs one blits() call instead of a FreeType render
+    """
+    
+    def __init__(self, font, color, chars=ATLAS_CHARS):
+        self.font = font
+        self.color = color
+        self.glyphs = {}
+        for char in chars:
+            self._add(char)
+
+    def _add(self, char):
+        """Render one glyph; the advance is the glyph surface width"""
+        surf = self.font.render(char, True, self.color).convert_alpha()
+        glyph = (surf, surf.get_width())
+        self.glyphs[char] = glyph
+        return glyph
+
+    def layout(self, text, x, y, seq):
+        """Append the (glyph, position) blits of text at (x, y) to seq"""
+        glyphs = self.glyphs
+        for char in text:
+            glyph = glyphs.get(char) or self._add(char)
+            seq.append((glyph[0], (x, y)))
+            x += glyph[1]
+        return seq
+
+    def save(self, path):
+        """
+        Write the glyphs as one horizontal strip to path + ".png" and their
+        characters and advances to path + ".json"
+        """
+        chars = "".join(self.glyphs)
+        advances = [self.glyphs[char][1] for char in chars]
+        height = max(surf.get_height() for surf, _ in self.glyphs.values())
+        strip = pygame.Surface((max(sum(advances), 1), height), pygame.SRCALPHA)
+        x = 0
+        for char in chars:
+            # Copy the glyph pixels unblended onto the transparent strip
+            strip.blit(self.glyphs[char][0], (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += self.glyphs[char][1]
+        pygame.image.save(strip, path + ".png")
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"chars": chars, "advances": advances}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, font, color, path):
+        """
+        Atlas from a strip written by save(); font is only used for
+        characters missing from the strip
+        """
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        strip = pygame.image.load(path + ".png").convert_alpha()
+        atlas = cls(font, color, chars="")
+        height = strip.get_height()
+        x = 0
+        for char, advance in zip(meta["chars"], meta["advances"]):
+            atlas.glyphs[char] = (strip.subsurface((x, 0, advance, height)), advance)
+            x += advance
+        return atlas
+
+
+def bitmap_font_path(spec, color):
+    """Path (without extension) of the pre-rasterized atlas of one font and color"""
+    name, size, bold = spec
+    return os.path.join(BITMAP_FONT_DIR, "font_{}_{}{}_{:02x}{:02x}{:02x}".format(
+        name.lower(), size, "b" if bold else "", *color))
+
+
+def load_glyph_atlas(font, spec, color):
+    """
+    Glyph atlas of font (SysFont spec (name, size, bold)) in color: the
+    pre-rasterized one from BITMAP_FONT_DIR if present, else rendered now
+    """
+    path = bitmap_font_path(spec, color)
+    if os.path.exists(path + ".png"):
+        try:
+            return GlyphAtlas.load(font, color, path)
+        except (pygame.error, OSError, ValueError, KeyError):
+            pass  # Unreadable atlas: render the glyphs instead
+    return GlyphAtlas(font, color)
 
 
 class Visualizer:
@@ -38,68 +191,282 @@ class Visualizer:
         self.CYAN = (0, 255, 255)
         
         # Fonts
-        self.font_small = pygame.font.SysFont("monospace", 14)
-        self.font_medium = pygame.font.SysFont("monospace", 16)
-        self.font_large = pygame.font.SysFont("monospace", 20, bold=True)
-        
-        # State history
-        self.history = []
+        self.font_small = pygame.font.SysFont(*FONT_SMALL)
+        self.font_medium = pygame.font.SysFont(*FONT_MEDIUM)
+        self.font_large = pygame.font.SysFont(*FONT_LARGE)
+        self._font_specs = {self.font_small: FONT_SMALL, self.font_medium: FONT_MEDIUM,
+                            self.font_large: FONT_LARGE}
+        
+        # Glyph atlases for dynamic text, one per (font, color), loaded from
+        # BITMAP_FONT_DIR or rendered on first use
+        self._atlases = {}
+        self._blits = batch_blitter(self.screen)
+        
+        # Static labels, rendered once (cached surfaces are converted to the
+        # display format so blits take the fast same-format path)
+        self._map_title_surf = self.font_medium.render(
+            "MAP VIEW (Top-Down)", True, (0, 255, 255)).convert_alpha()
+        self._scale_text_surf = self.font_small.render(
+            "Scale: 3.3px=1m", True, (150, 150, 150)).convert_alpha()
+        self._velocity_title_surf = self.font_small.render(
+            "VELOCITY", True, (0, 255, 0)).convert_alpha()
+        self._telemetry_title_surf = self.font_medium.render(
+            "◆ TELEMETRY ◆", True, (0, 255, 0)).convert_alpha()
+        self._history_title_surf = self.font_small.render(
+            "◆ HISTORY (Last 10) ◆", True, (0, 255, 255)).convert_alpha()
+        self._info_bar_text_surf = self.font_small.render(
+            "SPACE: Alt↑  |  SHIFT: Alt↓  |  W/S: Pitch  |  A/D: Roll  |  Q/E: Yaw  |  R: Reset  |  P: Pause  |  ESC: Exit",
+            True, (255, 255, 0)).convert_alpha()
+        self._input_ref_surf = self.font_small.render(
+            f"Roll: {0:+.1f}°", True, (200, 100, 100)).convert_alpha()
+        
+        # Input readouts by key mask (at most 2**6 combinations)
+        self._input_surf_cache = {}
+        
+        # State history: ring buffer of (x, y, z) for the last max_history
+        # frames; _history_head is the next row to write
         self.max_history = 15
+        self._history_xyz = np.empty((self.max_history, 3), dtype=np.float32)
+        self._history_head = 0
+        self._history_count = 0
+        # Map-space points of one frame: the drone, then the trail
+        self._map_points = np.empty((self.max_history + 1, 2))
         
-        # Current state (for map view)
-        self.current_state = {
-            'x': 0.0,
-            'y': 0.0,
-            'z': 3.5,
-            'vx': 0.0,
-            'vy': 0.0,
-            'vz': 0.0,
-            'roll': 0.0,
-            'pitch': 0.0,
-            'yaw': 0.0,
-        }
+        # Current state (for map view); the caller's object, not a copy, so
+        # only valid while update() runs
+        self.current_state = DroneState(z=3.5)
         
         # Display scale
         self.pos_scale = 10  # pixels per meter
+        
+        # Map view (top-down) placement
+        self.map_x = 50
+        self.map_y = 60
+        self.map_width = width - 100
+        self.map_height = height // 2 - 80
+        
+        # Altimeter bar placement (right side)
+        self.altimeter_x = width - 60
+        self.altimeter_y = 80
+        self.altimeter_height = 250
+        self.altimeter_width = 35
+        
+        # Static scenery, painted once and blitted every frame
+        self._background_surf = self._render_background()
+        self._map_overlay_surf = self._render_map_overlay()
+        self._altimeter_scale_surf, self._altimeter_scale_pos = self._render_altimeter_scale()
+        
+        # Rendered altimeter readouts by text; altitude is only shown in
+        # [0, 10) m at 0.1 m resolution, so this stays small
+        self._altitude_text_cache = {}
+        
+        # Last drawn panels: name -> [display key, copy of the panel pixels]
+        self._panel_cache = {}
+        # Last rendered telemetry rows: [row display key, surface] per row; a
+        # row's surface is redrawn in place and only grows for wider text
+        self._panel_line_cache = [[None, None] for _ in STATUS_ROWS]
+        
+        # Screen regions redrawn with changing content this frame; only these
+        # are presented, except on the first frame (and after clear() or
+        # invalidate()) when the whole screen is
+        self._dirty_rects = []
+        self._full_update = True
+        # The drone marker is clamped 5 px inside the map but reaches ~33 px
+        # from its center, so the map region is padded to cover it
+        self._map_dirty_rect = pygame.Rect(
+            self.map_x, self.map_y, self.map_width + 1, self.map_height + 1).inflate(70, 70)
 
-    def draw_background(self):
-        """Draw sky and ground"""
+    def _render_background(self):
+        """Paint sky, horizon, ground and ground grid into a screen-sized surface"""
+        surf = pygame.Surface((self.width, self.height)).convert()
+        
         # Horizon position
         horizon = int(self.height * 0.6)
         
         # Sky
-        pygame.draw.rect(self.screen, self.SKY_COLOR, (0, 0, self.width, horizon))
+        pygame.draw.rect(surf, self.SKY_COLOR, (0, 0, self.width, horizon))
         
         # Horizon line
-        pygame.draw.line(self.screen, self.HORIZON_COLOR, 
+        pygame.draw.line(surf, self.HORIZON_COLOR, 
                         (0, horizon), (self.width, horizon), 2)
         
         # Ground
-        pygame.draw.rect(self.screen, self.GROUND_COLOR,
+        pygame.draw.rect(surf, self.GROUND_COLOR,
                         (0, horizon, self.width, self.height - horizon))
         
         # Grid on ground
         grid_spacing = 50
         for x in range(0, self.width, grid_spacing):
-            pygame.draw.line(self.screen, (80, 60, 40), (x, horizon), (x, self.height), 1)
+            pygame.draw.line(surf, (80, 60, 40), (x, horizon), (x, self.height), 1)
         for y in range(horizon, self.height, grid_spacing):
-            pygame.draw.line(self.screen, (80, 60, 40), (0, y), (self.width, y), 1)
+            pygame.draw.line(surf, (80, 60, 40), (0, y), (self.width, y), 1)
+        return surf
+
+    def _render_map_overlay(self):
+        """
+        Paint the static part of the map view (fill, border, grid, origin
+        cross, scale hint) into a surface placed at (map_x, map_y)
+        Grid lines end one pixel past the map, hence the extra row/column
+        """
+        map_width = self.map_width
+        map_height = self.map_height
+        surf = pygame.Surface((map_width + 1, map_height + 1), pygame.SRCALPHA).convert_alpha()
+        
+        # Map background
+        pygame.draw.rect(surf, (30, 30, 30), (0, 0, map_width, map_height), 0)
+        pygame.draw.rect(surf, (0, 255, 255), (0, 0, map_width, map_height), 2)
+        
+        # Draw grid
+        grid_spacing = 50  # pixels
+        for gx in range(0, map_width, grid_spacing):
+            pygame.draw.line(surf, (50, 50, 50), (gx, 0), (gx, map_height), 1)
+        for gy in range(0, map_height, grid_spacing):
+            pygame.draw.line(surf, (50, 50, 50), (0, gy), (map_width, gy), 1)
+        
+        # Draw center cross (origin)
+        map_center_x = map_width // 2
+        map_center_y = map_height // 2
+        pygame.draw.line(surf, (100, 100, 100), 
+                        (map_center_x - 10, map_center_y), 
+                        (map_center_x + 10, map_center_y), 1)
+        pygame.draw.line(surf, (100, 100, 100), 
+                        (map_center_x, map_center_y - 10), 
+                        (map_center_x, map_center_y + 10), 1)
+        
+        # Scale indicator
+        surf.blit(self._scale_text_surf, (map_width - 120, map_height - 20))
+        return surf
+
+    def _render_altimeter_scale(self):
+        """
+        Paint the altimeter border, ticks and labels into a surface
+
+        Returns:
+            (surface, screen position)
+        """
+        bar_height = self.altimeter_height
+        bar_width = self.altimeter_width
+        # Labels start 35 px left of the bar and 5 px above each tick
+        left = 35
+        top = 5
+        surf = pygame.Surface((left + bar_width + 1,
+                               top + bar_height + self.font_small.get_linesize()),
+                              pygame.SRCALPHA).convert_alpha()
+        
+        # Bar border (green)
+        pygame.draw.rect(surf, (0, 255, 0), (left, top, bar_width, bar_height), 2)
+        
+        # Scale markings
+        for i in range(0, 21):
+            y = top + (bar_height * i // 20)
+            alt = 10 - (i * 10 // 20)  # 10m to 0m
+            
+            if i % 5 == 0:
+                pygame.draw.line(surf, (0, 255, 0), (left - 8, y), (left, y), 2)
+                text = self.font_small.render(f"{alt}m", True, (0, 255, 0))
+                surf.blit(text, (0, y - 5))
+            elif i % 2 == 0:
+                pygame.draw.line(surf, (0, 150, 150), (left - 4, y), (left, y), 1)
+        
+        pos = (self.altimeter_x - bar_width//2 - left, self.altimeter_y - top)
+        return surf, pos
+
+    def _push_history(self, x, y, z):
+        """Append one position to the history ring, overwriting the oldest"""
+        self._history_xyz[self._history_head] = (x, y, z)
+        self._history_head = (self._history_head + 1) % self.max_history
+        self._history_count = min(self._history_count + 1, self.max_history)
+
+    def get_history(self):
+        """(n, 3) array of stored (x, y, z) positions, oldest first"""
+        buf = self._history_xyz
+        if self._history_count < self.max_history:
+            return buf[:self._history_count]
+        head = self._history_head
+        return np.concatenate((buf[head:], buf[:head]))
+
+    def _blit_cached_panel(self, name, key, rect):
+        """
+        Blit the stored pixels of panel `name` if it was last drawn with the
+        same display key; returns False if the panel has to be redrawn
+        """
+        cached = self._panel_cache.get(name)
+        if cached is None or cached[0] != key:
+            return False
+        self.screen.blit(cached[1], rect)
+        return True
+
+    def _store_panel(self, name, key, rect):
+        """
+        Remember the just-drawn pixels of panel `name` for its display key,
+        copying them into the panel's surface (allocated on first use)
+        """
+        cached = self._panel_cache.get(name)
+        if cached is None:
+            cached = self._panel_cache[name] = [key, pygame.Surface(rect[2:]).convert()]
+        cached[0] = key
+        cached[1].blit(self.screen, (0, 0), rect)
+
+    def _input_surf(self, key_mask):
+        """Rendered "INPUT: ..." readout for the shown keys of key_mask"""
+        key_mask &= INPUT_MASK
+        surf = self._input_surf_cache.get(key_mask)
+        if surf is None:
+            input_text = "INPUT:" + "".join(label for bit, label in INPUT_LABELS
+                                            if key_mask >> bit & 1)
+            if input_text == "INPUT:":
+                input_text = "INPUT: --"
+            surf = self.font_small.render(input_text, True, (255, 200, 100)).convert_alpha()
+            self._input_surf_cache[key_mask] = surf
+        return surf
+
+    def _layout_text(self, text, x, y, color, font, seq):
+        """Append the glyph blits of text from the (font, color) atlas to seq"""
+        atlas = self._atlases.get((font, color))
+        if atlas is None:
+            atlas = self._atlases[(font, color)] = load_glyph_atlas(
+                font, self._font_specs[font], color)
+        return atlas.layout(text, x, y, seq)
+
+    def _render_line(self, text, color, font, surf=None):
+        """
+        Text from the (font, color) glyph atlas on one transparent surface
+        surf is cleared and reused if it is wide enough, else a wider one is
+        allocated; returns the surface drawn into
+        """
+        seq = self._layout_text(text, 0, 0, color, font, [])
+        width = max((pos[0] + glyph.get_width() for glyph, pos in seq), default=1)
+        if surf is None or surf.get_width() < width:
+            surf = pygame.Surface((width, font.get_height()), pygame.SRCALPHA).convert_alpha()
+        else:
+            surf.fill((0, 0, 0, 0))
+        # Glyphs do not overlap, so MAX copies them onto the transparent
+        # surface unblended and the line blits like the glyphs would
+        surf.blits([(glyph, pos, None, pygame.BLEND_RGBA_MAX) for glyph, pos in seq],
+                   doreturn=False)
+        return surf
+
+    def _blit_text(self, text, x, y, color, font):
+        """Draw dynamic text from the (font, color) glyph atlas"""
+        self._blits(self._layout_text(text, x, y, color, font, []))
+
+    def draw_background(self):
+        """Draw sky and ground"""
+        self.screen.blit(self._background_surf, (0, 0))
 
     def draw_crosshair(self):
         """Draw top-down map showing drone actual position"""
         # Map view (top-down)
-        map_x = 50
-        map_y = 60
-        map_width = self.width - 100
-        map_height = self.height // 2 - 80
+        map_x = self.map_x
+        map_y = self.map_y
+        map_width = self.map_width
+        map_height = self.map_height
         
-        # Map background
-        pygame.draw.rect(self.screen, (30, 30, 30), (map_x, map_y, map_width, map_height), 0)
-        pygame.draw.rect(self.screen, (0, 255, 255), (map_x, map_y, map_width, map_height), 2)
+        self._dirty_rects.append(self._map_dirty_rect)
         
-        # Map title
-        title = self.font_medium.render("MAP VIEW (Top-Down)", True, (0, 255, 255))
-        self.screen.blit(title, (map_x + 10, map_y - 20))
+        # Static map (background, border, grid, origin, scale) and title
+        self._blits([(self._map_overlay_surf, (map_x, map_y)),
+                      (self._map_title_surf, (map_x + 10, map_y - 20))])
         
         # Scale: pixels per meter
         # Reduce scale to see more area and make movement more visible
@@ -109,28 +476,18 @@ class Visualizer:
         map_center_x = map_x + map_width // 2
         map_center_y = map_y + map_height // 2
         
-        # Draw grid
-        grid_spacing = 50  # pixels
-        for gx in range(map_x, map_x + map_width, grid_spacing):
-            pygame.draw.line(self.screen, (50, 50, 50), (gx, map_y), (gx, map_y + map_height), 1)
-        for gy in range(map_y, map_y + map_height, grid_spacing):
-            pygame.draw.line(self.screen, (50, 50, 50), (map_x, gy), (map_x + map_width, gy), 1)
-        
-        # Draw center cross (origin)
-        pygame.draw.line(self.screen, (100, 100, 100), 
-                        (map_center_x - 10, map_center_y), 
-                        (map_center_x + 10, map_center_y), 1)
-        pygame.draw.line(self.screen, (100, 100, 100), 
-                        (map_center_x, map_center_y - 10), 
-                        (map_center_x, map_center_y + 10), 1)
-        
-        # Draw drone position
-        drone_screen_x = int(map_center_x + self.current_state['x'] * scale)
-        drone_screen_y = int(map_center_y + self.current_state['y'] * scale)
-        
-        # Clamp to map bounds
-        drone_screen_x = max(map_x + 5, min(map_x + map_width - 5, drone_screen_x))
-        drone_screen_y = max(map_y + 5, min(map_y + map_height - 5, drone_screen_y))
+        # Drone position and trail (history, oldest first), projected,
+        # clamped to the map bounds and cast to pixels in one pass
+        n_trail = self._history_count
+        pts = self._map_points[:n_trail + 1]
+        pts[0] = (self.current_state.x, self.current_state.y)
+        pts[1:] = self.get_history()[:, :2]
+        pts *= scale
+        pts += (map_center_x, map_center_y)
+        np.clip(pts[:, 0], map_x + 5, map_x + map_width - 5, out=pts[:, 0])
+        np.clip(pts[:, 1], map_y + 5, map_y + map_height - 5, out=pts[:, 1])
+        screen_pts = pts.astype(np.int32).tolist()
+        drone_screen_x, drone_screen_y = screen_pts[0]
         
         # Draw drone (MUCH BIGGER - 40px)
         drone_size = 40
@@ -157,59 +514,39 @@ class Visualizer:
             pygame.draw.circle(self.screen, self.GREEN, pos, motor_radius, 2)
         
         # Heading indicator (front of drone) - BLUE ARROW
-        yaw = self.current_state['yaw']
+        yaw = self.current_state.yaw
         heading_length = 25
-        head_x = drone_screen_x + heading_length * math.cos(yaw - math.pi/2)
-        head_y = drone_screen_y + heading_length * math.sin(yaw - math.pi/2)
+        ch = math.cos(yaw - math.pi/2)
+        sh = math.sin(yaw - math.pi/2)
+        head_x = drone_screen_x + heading_length * ch
+        head_y = drone_screen_y + heading_length * sh
         pygame.draw.line(self.screen, self.BLUE, (drone_screen_x, drone_screen_y), 
                         (head_x, head_y), 4)
         
-        # Arrow head
+        # Arrow head (angle-sum identities for heading +- 2.5 rad)
         arrow_size = 8
-        arrow_angle1 = yaw - math.pi/2 + 2.5
-        arrow_angle2 = yaw - math.pi/2 - 2.5
-        arrow_x1 = head_x + arrow_size * math.cos(arrow_angle1)
-        arrow_y1 = head_y + arrow_size * math.sin(arrow_angle1)
-        arrow_x2 = head_x + arrow_size * math.cos(arrow_angle2)
-        arrow_y2 = head_y + arrow_size * math.sin(arrow_angle2)
+        arrow_x1 = head_x + arrow_size * (ch * C25 - sh * S25)
+        arrow_y1 = head_y + arrow_size * (sh * C25 + ch * S25)
+        arrow_x2 = head_x + arrow_size * (ch * C25 + sh * S25)
+        arrow_y2 = head_y + arrow_size * (sh * C25 - ch * S25)
         pygame.draw.line(self.screen, self.BLUE, (head_x, head_y), (arrow_x1, arrow_y1), 3)
         pygame.draw.line(self.screen, self.BLUE, (head_x, head_y), (arrow_x2, arrow_y2), 3)
         
         # Draw trail (history)
-        try:
-            if len(self.history) > 1:
-                trail_points = []
-                for entry in self.history[-50:]:  # Last 50 points
-                    # Check if entry has position keys
-                    if 'x' in entry and 'y' in entry:
-                        trail_x = int(map_center_x + entry['x'] * scale)
-                        trail_y = int(map_center_y + entry['y'] * scale)
-                        trail_x = max(map_x + 5, min(map_x + map_width - 5, trail_x))
-                        trail_y = max(map_y + 5, min(map_y + map_height - 5, trail_y))
-                        trail_points.append((trail_x, trail_y))
-                
-                # Draw trail only if we have 2+ valid points
-                if len(trail_points) >= 2:
-                    pygame.draw.lines(self.screen, (0, 200, 100), trail_points, 1)
-        except Exception as e:
-            pass  # Silently skip trail if error
+        if n_trail > 1:
+            pygame.draw.lines(self.screen, (0, 200, 100), False, screen_pts[1:], 1)
         
         # Add coordinate display
-        coord_text = self.font_small.render(
-            f"X={self.current_state['x']:+.1f}m  Y={self.current_state['y']:+.1f}m",
-            True, (100, 255, 100)
-        )
-        self.screen.blit(coord_text, (map_x + 10, map_y + map_height - 20))
-        
-        # Scale indicator
-        scale_text = self.font_small.render("Scale: 3.3px=1m", True, (150, 150, 150))
-        self.screen.blit(scale_text, (map_x + map_width - 120, map_y + map_height - 20))
+        self._blit_text(f"X={self.current_state.x:+.1f}m  Y={self.current_state.y:+.1f}m",
+                        map_x + 10, map_y + map_height - 20, MAP_TEXT_COLOR, self.font_small)
 
     def draw_attitude_indicator(self, roll, pitch):
         """Draw attitude indicator (attitude ball) - LOWER LEFT"""
         x_start = 25
         y_start = 200
         radius = 45
+        self._dirty_rects.append(pygame.Rect(x_start - radius, y_start - radius,
+                                             2 * radius + 1, 2 * radius + 1))
         
         # Draw outer circle border (blue)
         pygame.draw.circle(self.screen, (0, 150, 255), (x_start, y_start), radius, 2)
@@ -231,28 +568,17 @@ class Visualizer:
 
     def draw_altimeter(self, altitude):
         """Draw vertical altitude bar on right side"""
-        x = self.width - 60
-        y_start = 80
-        bar_height = 250
-        bar_width = 35
-        
-        # Bar border (green)
-        pygame.draw.rect(self.screen, (0, 255, 0),
-                        (x - bar_width//2, y_start, bar_width, bar_height), 2)
-        
-        # Scale markings
-        for i in range(0, 21):
-            y = y_start + (bar_height * i // 20)
-            alt = 10 - (i * 10 // 20)  # 10m to 0m
-            
-            if i % 5 == 0:
-                pygame.draw.line(self.screen, (0, 255, 0), (x - bar_width//2 - 8, y),
-                               (x - bar_width//2, y), 2)
-                text = self.font_small.render(f"{alt}m", True, (0, 255, 0))
-                self.screen.blit(text, (x - bar_width//2 - 35, y - 5))
-            elif i % 2 == 0:
-                pygame.draw.line(self.screen, (0, 150, 150), (x - bar_width//2 - 4, y),
-                               (x - bar_width//2, y), 1)
+        x = self.altimeter_x
+        y_start = self.altimeter_y
+        bar_height = self.altimeter_height
+        bar_width = self.altimeter_width
+        # Readout, scale and indicator column (the readout is centered 10 px
+        # above the indicator, which spans the bar height)
+        self._dirty_rects.append(pygame.Rect(x - 70, y_start - 12,
+                                             70 + bar_width//2 + 16, bar_height + 30))
+        
+        # Border, scale markings and labels
+        self.screen.blit(self._altimeter_scale_surf, self._altimeter_scale_pos)
         
         # Current altitude indicator (triangle on right)
         if altitude < 10:
@@ -263,11 +589,15 @@ class Visualizer:
                                (x + bar_width//2 + 3, indicator_y + 6)])
             
             # Altitude value display
-            alt_text = self.font_medium.render(f"{altitude:.1f}m", True, (0, 255, 0))
+            label = f"{altitude:.1f}m"
+            alt_text = self._altitude_text_cache.get(label)
+            if alt_text is None:
+                alt_text = self.font_medium.render(label, True, (0, 255, 0)).convert_alpha()
+                self._altitude_text_cache[label] = alt_text
             self.screen.blit(alt_text, (x - 70, indicator_y - 10))
 
-    def draw_velocity_indicator(self, vx, vy, vz):
-        """Draw velocity vectors on left side"""
+    def draw_velocity_indicator(self, vx, vy, vz, key_mask=0):
+        """Draw velocity vectors and pressed control keys on left side"""
         x_start = 20
         y_start = self.height - 100
         
@@ -278,18 +608,15 @@ class Visualizer:
         pygame.draw.rect(self.screen, (100, 200, 100), (x_start - 5, y_start - 60, 140, 80), 2)
         
         # Title
-        title = self.font_small.render("VELOCITY", True, (0, 255, 0))
-        self.screen.blit(title, (x_start + 5, y_start - 55))
+        self.screen.blit(self._velocity_title_surf, (x_start + 5, y_start - 55))
         
         # Horizontal velocity
-        color_vh = (0, 255, 100) if speed_h < 5 else ((255, 200, 0) if speed_h < 15 else (255, 100, 0))
-        text1 = self.font_small.render(f"Vh: {speed_h:5.2f} m/s", True, color_vh)
-        self.screen.blit(text1, (x_start, y_start - 35))
+        color_vh = VH_COLORS[0] if speed_h < 5 else (VH_COLORS[1] if speed_h < 15 else VH_COLORS[2])
+        self._blit_text(f"Vh: {speed_h:5.2f} m/s", x_start, y_start - 35, color_vh, self.font_small)
         
         # Vertical velocity
-        color_vz = (100, 200, 255) if vz > 0 else ((255, 100, 100) if vz < -0.1 else (100, 255, 100))
-        text2 = self.font_small.render(f"Vz: {vz:+5.2f} m/s", True, color_vz)
-        self.screen.blit(text2, (x_start, y_start - 18))
+        color_vz = VZ_COLORS[0] if vz > 0 else (VZ_COLORS[1] if vz < -0.1 else VZ_COLORS[2])
+        self._blit_text(f"Vz: {vz:+5.2f} m/s", x_start, y_start - 18, color_vz, self.font_small)
         
         # Input status - show what keys are being pressed
         input_box_x = x_start - 5
@@ -297,35 +624,13 @@ class Visualizer:
         pygame.draw.rect(self.screen, (30, 30, 30), (input_box_x, input_box_y, 140, 50), 0)
         pygame.draw.rect(self.screen, (200, 100, 0), (input_box_x, input_box_y, 140, 50), 2)
         
-        # Try to get keyboard state - will show what we think is pressed
-        try:
-            keys = pygame.key.get_pressed()
-            input_text = "INPUT:"
-            if keys[pygame.K_w]:
-                input_text += " [W↑]"
-            if keys[pygame.K_s]:
-                input_text += " [S↓]"
-            if keys[pygame.K_a]:
-                input_text += " [A←]"
-            if keys[pygame.K_d]:
-                input_text += " [D→]"
-            if keys[pygame.K_SPACE]:
-                input_text += " [SP↑]"
-            if keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]:
-                input_text += " [SH↓]"
-            
-            if input_text == "INPUT:":
-                input_text = "INPUT: --"
-            
-            input_display = self.font_small.render(input_text, True, (255, 200, 100))
-            self.screen.blit(input_display, (input_box_x + 3, input_box_y + 3))
-            
-            # Reference values
-            ref_text = f"Roll: {0:+.1f}°"
-            ref_display = self.font_small.render(ref_text, True, (200, 100, 100))
-            self.screen.blit(ref_display, (input_box_x + 3, input_box_y + 20))
-        except Exception as e:
-            pass  # Silently ignore if error
+        # Pressed keys (from the event path) and reference values; a long
+        # readout runs past the box
+        input_surf = self._input_surf(key_mask)
+        self._blits([(input_surf, (input_box_x + 3, input_box_y + 3)),
+                     (self._input_ref_surf, (input_box_x + 3, input_box_y + 20))])
+        self._dirty_rects.append(pygame.Rect(x_start - 5, y_start - 60,
+                                             max(140, input_surf.get_width() + 3), 130))
 
     def draw_status_panel(self, state):
         """Draw main status panel with telemetry"""
@@ -333,6 +638,18 @@ class Visualizer:
         panel_y = self.height - 230  # Moved higher to make room for history
         panel_width = 320
         panel_height = 110  # Reduced height
+        panel_rect = (panel_x, panel_y, panel_width, panel_height)
+        self._dirty_rects.append(pygame.Rect(panel_rect))
+        
+        # Row texts at display precision; skip the redraw if none changed
+        # (e.g. while paused)
+        roll, pitch, yaw = state.roll * _RAD2DEG, state.pitch * _RAD2DEG, state.yaw * _RAD2DEG
+        roll_ref, pitch_ref = state.roll_ref * _RAD2DEG, state.pitch_ref * _RAD2DEG
+        values = (state.z, state.z_ref, state.vz, state.x, state.y,
+                  roll, roll_ref, pitch, pitch_ref, yaw, state.thrust, state.sim_time)
+        key = tuple(fmt.format(*values[fields]) for fields, _, fmt in STATUS_ROWS)
+        if self._blit_cached_panel("status", key, panel_rect):
+            return
         
         # Panel background
         pygame.draw.rect(self.screen, (20, 20, 20), 
@@ -340,47 +657,26 @@ class Visualizer:
         pygame.draw.rect(self.screen, (0, 200, 0),
                         (panel_x, panel_y, panel_width, panel_height), 2)
         
-        # Title
-        title = self.font_medium.render("◆ TELEMETRY ◆", True, (0, 255, 0))
-        self.screen.blit(title, (panel_x + 10, panel_y + 3))
+        # Title and status lines, drawn with one batched blit
+        x = panel_x + 10
+        seq = [(self._telemetry_title_surf, (x, panel_y + 3))]
         
-        # Draw status lines with proper spacing
+        # Draw status lines with proper spacing; a row is only rendered again
+        # when its text changes (keyed on the text itself, so -0.0 vs +0.0
+        # shows up)
         y_offset = 20
         line_height = 15
-        
-        # Row 1: Altitude
-        text = self.font_small.render(
-            f"Alt: {state['z']:.2f}m  Ref: {state['z_ref']:.2f}m  Vz: {state['vz']:+.2f}m/s", 
-            True, (0, 255, 0))
-        self.screen.blit(text, (panel_x + 10, panel_y + y_offset))
-        y_offset += line_height
-        
-        # Row 2: Position
-        text = self.font_small.render(
-            f"Pos: X={state['x']:+.1f}m  Y={state['y']:+.1f}m", 
-            True, (100, 200, 255))
-        self.screen.blit(text, (panel_x + 10, panel_y + y_offset))
-        y_offset += line_height
-        
-        # Row 3: Roll
-        text = self.font_small.render(
-            f"Roll: {math.degrees(state['roll']):+6.1f}°  Ref: {math.degrees(state['roll_ref']):+6.1f}°", 
-            True, (255, 100, 100))
-        self.screen.blit(text, (panel_x + 10, panel_y + y_offset))
-        y_offset += line_height
-        
-        # Row 4: Pitch
-        text = self.font_small.render(
-            f"Pitch: {math.degrees(state['pitch']):+6.1f}°  Ref: {math.degrees(state['pitch_ref']):+6.1f}°", 
-            True, (255, 100, 100))
-        self.screen.blit(text, (panel_x + 10, panel_y + y_offset))
-        y_offset += line_height
-        
-        # Row 5: Yaw + Thrust combined
-        text = self.font_small.render(
-            f"Yaw: {math.degrees(state['yaw']):+6.1f}°  Thrust: {state['thrust']:.2f}N  Time: {state['sim_time']:.2f}s", 
-            True, (200, 200, 200))
-        self.screen.blit(text, (panel_x + 10, panel_y + y_offset))
+        line_cache = self._panel_line_cache
+        for row, (text, (_, color, _)) in enumerate(zip(key, STATUS_ROWS)):
+            cached = line_cache[row]
+            if cached[0] != text:
+                cached[0] = text
+                cached[1] = self._render_line(text, color, self.font_small, cached[1])
+            seq.append((cached[1], (x, panel_y + y_offset)))
+            y_offset += line_height
+        
+        self._blits(seq)
+        self._store_panel("status", key, panel_rect)
 
     def draw_history(self):
         """Draw state history at bottom right"""
@@ -389,7 +685,15 @@ class Visualizer:
         history_x = self.width - history_width - 10
         history_y = self.height - history_height - 10
         
-        if not self.history:
+        if not self._history_count:
+            return
+        
+        # Keyed on the shown entry texts; skip the redraw if none changed
+        history_rect = (history_x, history_y, history_width, history_height)
+        self._dirty_rects.append(pygame.Rect(history_rect))
+        last_z = self.get_history()[-10:, 2].tolist()
+        key = tuple(f"{i}: z={z:.1f}" for i, z in enumerate(last_z))
+        if self._blit_cached_panel("history", key, history_rect):
             return
         
         # Background
@@ -398,70 +702,82 @@ class Visualizer:
         pygame.draw.rect(self.screen, (0, 200, 200),
                         (history_x, history_y, history_width, history_height), 2)
         
-        # Title
-        title = self.font_small.render("◆ HISTORY (Last 10) ◆", True, (0, 255, 255))
-        self.screen.blit(title, (history_x + 5, history_y + 3))
+        # Title and entries, drawn with one batched blit
+        seq = [(self._history_title_surf, (history_x + 5, history_y + 3))]
         
         # Display in horizontal format - 10 columns (compact)
         y_offset = 18
         col_width = history_width // 10
         
-        for i, entry in enumerate(self.history[-10:]):
+        for i, text in enumerate(key):
             col = i
             x_pos = history_x + (col * col_width)
             y_pos = history_y + y_offset
             
-            text = self.font_small.render(
-                f"{i}: z={entry['z']:.1f}",
-                True, (0, 255, 200)
-            )
-            self.screen.blit(text, (x_pos + 2, y_pos))
+            self._layout_text(text, x_pos + 2, y_pos,
+                              HISTORY_COLOR, self.font_small, seq)
+        
+        self._blits(seq)
+        self._store_panel("history", key, history_rect)
 
     def draw_info_bar(self):
         """Draw information bar at top"""
         info_y = 5
         
-        info_text = "SPACE: Alt↑  |  SHIFT: Alt↓  |  W/S: Pitch  |  A/D: Roll  |  Q/E: Yaw  |  R: Reset  |  P: Pause  |  ESC: Exit"
-        text = self.font_small.render(info_text, True, (255, 255, 0))
-        
         # Background
         pygame.draw.rect(self.screen, (30, 30, 0), (0, 0, self.width, 20), 0)
         pygame.draw.line(self.screen, (200, 200, 0), (0, 19), (self.width, 19), 1)
-        self.screen.blit(text, (10, info_y))
+        self.screen.blit(self._info_bar_text_surf, (10, info_y))
 
-    def update(self, state):
+    def update(self, state, key_mask=0):
         """
         Update display with current state
         
+        The state is read, never modified, and must not change during the
+        call; it is not copied, so the caller may reuse it (as
+        QuadcopterSimulator.drone_state() does). Only x, y, z are kept, in
+        the history ring.
+        
         Args:
-            state: Current quadcopter state
+            state: Current quadcopter state (drone_state.DroneState)
+            key_mask: Pressed control keys (controller.KEY_BITS layout)
         """
         # Store current state for map view
-        self.current_state = state.copy()
-        
-        self.screen.fill((0, 0, 0))
+        self.current_state = state
+        self._dirty_rects.clear()
         
-        # Draw scene
+        # Draw scene (the cached background covers the whole screen, so no
+        # clearing fill is needed)
         self.draw_background()
         self.draw_crosshair()
-        self.draw_attitude_indicator(state["roll"], state["pitch"])
-        self.draw_altimeter(state["z"])
-        self.draw_velocity_indicator(state["vx"], state["vy"], state["vz"])
+        self.draw_attitude_indicator(state.roll, state.pitch)
+        self.draw_altimeter(state.z)
+        self.draw_velocity_indicator(state.vx, state.vy, state.vz, key_mask)
         
         # Draw telemetry and info
         self.draw_status_panel(state)
         self.draw_info_bar()
         
         # Update history
-        self.history.append(state.copy())
-        if len(self.history) > self.max_history:
-            self.history.pop(0)
+        self._push_history(state.x, state.y, state.z)
         self.draw_history()
         
-        # Update display
-        pygame.display.update()
+        # Present the changed regions (everything on the first frame)
+        if self._full_update:
+            pygame.display.update()
+            self._full_update = False
+        else:
+            pygame.display.update(self._dirty_rects)
+
+    def invalidate(self):
+        """
+        Present the whole screen with the next update(), e.g. after the window
+        contents were lost (exposed or restored window)
+        """
+        self._full_update = True
 
     def clear(self):
         """Clear display"""
         self.screen.fill((0, 0, 0))
-        pygame.display.update()
\ No newline at end of file
+        pygame.display.update()
+        self.invalidate()
\ No newline at end of file